@@ -0,0 +1,203 @@
+'''
+Business: Reference image attachments for orders and chat - upload, list and download originals or thumbnails
+Args: event with httpMethod, headers (X-Auth-Token, Content-Type, If-None-Match), raw base64 body for uploads,
+      queryStringParameters (order_id, name for upload and listing; id, variant=original|thumb for download)
+Returns: HTTP response with attachment metadata, list of attachments or file content
+'''
+
+import base64
+import binascii
+import os
+from typing import Dict, Any, Iterator, Optional
+from psycopg2.extras import RealDictCursor
+from shared.db import connection
+from shared import queries, thumbnails
+from shared.http import HttpError, Router, json_response, raw_response, error, get_header
+from shared.principal import require_identity, resolve_principal
+from shared.storage import CHUNK_SIZE, TooLarge, get_storage
+
+# Base64 groups of 4 characters decode to 3 bytes, so both chunk sizes stay aligned
+BASE64_CHUNK = CHUNK_SIZE // 3 * 4
+READ_CHUNK = CHUNK_SIZE // 3 * 3
+SIGNATURES = {
+    'image/jpeg': (b'\xff\xd8\xff',),
+    'image/png': (b'\x89PNG\r\n\x1a\n',),
+    'image/gif': (b'GIF87a', b'GIF89a'),
+    'image/webp': (b'RIFF',),
+}
+CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+router = Router('attachments', allow_headers='Content-Type, X-Auth-Token, X-User-Id, If-None-Match')
+
+def max_bytes() -> int:
+    return int(os.environ.get('ATTACHMENT_MAX_BYTES', str(10 * 1024 * 1024)))
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    return router.dispatch(event, context)
+
+def check_access(cur: Any, identity: Dict[str, Any], order_id: int) -> None:
+    user = resolve_principal(cur, identity)
+    
+    queries.execute(cur, 'order_owner', (order_id,))
+    order = cur.fetchone()
+    
+    if not order:
+        raise HttpError(404, 'Заказ не найден')
+    
+    if not user or (user['role'] != 'master' and order['user_id'] != identity['id']):
+        raise HttpError(403, 'Доступ запрещен')
+
+def sniff_type(head: bytes) -> Optional[str]:
+    for content_type, signatures in SIGNATURES.items():
+        if head.startswith(signatures):
+            if content_type == 'image/webp' and head[8:12] != b'WEBP':
+                continue
+            return content_type
+    return None
+
+def decode_chunks(body: str) -> Iterator[bytes]:
+    for offset in range(0, len(body), BASE64_CHUNK):
+        yield base64.b64decode(body[offset:offset + BASE64_CHUNK], validate=True)
+
+def encode_file(storage: Any, sha256: str) -> str:
+    parts = []
+    with storage.open(sha256) as f:
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                break
+            parts.append(base64.b64encode(chunk).decode('ascii'))
+    return ''.join(parts)
+
+@router.route('GET')
+@require_identity
+def get_attachments(event: Dict[str, Any], identity: Dict[str, Any]) -> Dict[str, Any]:
+    params = event.get('queryStringParameters') or {}
+    
+    try:
+        attachment_id = int(params['id']) if params.get('id') else None
+        order_id = int(params['order_id']) if params.get('order_id') else None
+    except ValueError:
+        return error(400, 'Неверный параметр id или order_id')
+    
+    if attachment_id is not None:
+        return download(event, identity, attachment_id, params.get('variant') or 'original')
+    
+    if order_id is None:
+        return error(400, 'Не указан ID заказа')
+    
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        check_access(cur, identity, order_id)
+        cur.execute(
+            """SELECT a.id, a.order_id, a.message_id, a.uploader_id, a.file_name, a.created_at,
+                      b.content_type, b.size_bytes, b.thumb_status, b.thumb_width, b.thumb_height
+               FROM t_p57800500_anime_tattoo_website.attachments a
+               JOIN t_p57800500_anime_tattoo_website.attachment_blobs b ON b.sha256 = a.blob_sha256
+               WHERE a.order_id = %s
+               ORDER BY a.id""",
+            (order_id,)
+        )
+        attachments = cur.fetchall()
+    
+    return json_response(200, attachments)
+
+def download(event: Dict[str, Any], identity: Dict[str, Any], attachment_id: int, variant: str) -> Dict[str, Any]:
+    if variant not in ('original', 'thumb'):
+        return error(400, 'variant должен быть original или thumb')
+    
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(
+            """SELECT a.order_id, b.sha256, b.content_type, b.thumb_status, b.thumb_sha256
+               FROM t_p57800500_anime_tattoo_website.attachments a
+               JOIN t_p57800500_anime_tattoo_website.attachment_blobs b ON b.sha256 = a.blob_sha256
+               WHERE a.id = %s""",
+            (attachment_id,)
+        )
+        attachment = cur.fetchone()
+        
+        if not attachment:
+            return error(404, 'Вложение не найдено')
+        
+        check_access(cur, identity, attachment['order_id'])
+    
+    if variant == 'thumb':
+        if attachment['thumb_status'] != 'ready':
+            return error(404, 'Миниатюра недоступна', {'X-Thumb-Status': attachment['thumb_status']})
+        sha256, content_type = attachment['thumb_sha256'], 'image/webp'
+    else:
+        sha256, content_type = attachment['sha256'], attachment['content_type']
+    
+    headers = {'ETag': f'"{sha256}"', 'Cache-Control': CACHE_CONTROL}
+    if get_header(event.get('headers'), 'If-None-Match') == headers['ETag']:
+        return raw_response(304, '', content_type, headers)
+    
+    return raw_response(200, encode_file(get_storage(), sha256), content_type, headers, is_base64=True)
+
+@router.route('POST')
+@require_identity
+def upload(event: Dict[str, Any], identity: Dict[str, Any]) -> Dict[str, Any]:
+    params = event.get('queryStringParameters') or {}
+    body = event.get('body') or ''
+    limit = max_bytes()
+    
+    try:
+        order_id = int(params['order_id'])
+    except (KeyError, ValueError):
+        return error(400, 'Не указан ID заказа')
+    
+    if not event.get('isBase64Encoded'):
+        return error(400, 'Ожидается файл изображения в теле запроса')
+    
+    if len(body) // 4 * 3 > limit + 2:
+        return error(413, f'Файл больше {limit // (1024 * 1024)} МБ')
+    
+    try:
+        content_type = sniff_type(base64.b64decode(body[:24], validate=True))
+    except binascii.Error:
+        content_type = None
+    declared = (get_header(event.get('headers'), 'Content-Type') or '').split(';')[0].strip().lower()
+    
+    if content_type is None or declared not in ('', 'application/octet-stream', content_type):
+        return error(415, 'Поддерживаются только изображения JPEG, PNG, GIF и WEBP')
+    
+    file_name = (params.get('name') or '').strip()[:255] or None
+    
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        check_access(cur, identity, order_id)
+        
+        try:
+            sha256, size = get_storage().put(decode_chunks(body), limit)
+        except TooLarge:
+            return error(413, f'Файл больше {limit // (1024 * 1024)} МБ')
+        except binascii.Error:
+            return error(400, 'Неверная кодировка файла')
+        
+        cur.execute(
+            """INSERT INTO t_p57800500_anime_tattoo_website.attachment_blobs (sha256, size_bytes, content_type)
+               VALUES (%s, %s, %s)
+               ON CONFLICT (sha256) DO NOTHING
+               RETURNING sha256""",
+            (sha256, size, content_type)
+        )
+        is_new = cur.fetchone() is not None
+        
+        cur.execute(
+            """INSERT INTO t_p57800500_anime_tattoo_website.attachments (order_id, uploader_id, blob_sha256, file_name)
+               VALUES (%s, %s, %s, %s)
+               RETURNING id, order_id, message_id, uploader_id, file_name, created_at""",
+            (order_id, identity['id'], sha256, file_name)
+        )
+        attachment = cur.fetchone()
+        
+        cur.execute(
+            """SELECT content_type, size_bytes, thumb_status, thumb_width, thumb_height
+               FROM t_p57800500_anime_tattoo_website.attachment_blobs WHERE sha256 = %s""",
+            (sha256,)
+        )
+        attachment.update(cur.fetchone())
+        conn.commit()
+    
+    if is_new:
+        thumbnails.submit(sha256)
+    
+    return json_response(201, attachment)
\ No newline at end of file
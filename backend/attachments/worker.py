@@ -0,0 +1,29 @@
+'''
+Business: Generate thumbnails for attachment blobs still pending - picks up work lost when a function instance stopped
+Args: --limit N blobs per run (default 500), --workers N (default THUMBNAIL_WORKERS)
+Returns: prints processed blobs per resulting status
+'''
+
+import argparse
+import os
+import time
+from collections import Counter
+from shared import thumbnails
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--limit', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('THUMBNAIL_WORKERS', '2')))
+    args = parser.parse_args()
+    os.environ['THUMBNAIL_WORKERS'] = str(args.workers)
+
+    started = time.perf_counter()
+    futures = [thumbnails.submit(sha256) for sha256 in thumbnails.pending(args.limit)]
+    stats = Counter(future.result() for future in futures)
+    elapsed = time.perf_counter() - started
+    print(', '.join(f'{key}={value}' for key, value in sorted(stats.items())) + f', blobs={len(futures)}, seconds={elapsed:.3f}')
+
+
+if __name__ == '__main__':
+    main()
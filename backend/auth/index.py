@@ -1,165 +1,89 @@
 '''
 Business: User authentication - login and registration
 Args: event with httpMethod, body (email, password, name for registration)
-Returns: HTTP response with user data and token or error
+Returns: HTTP response with user data and signed session token or error
 '''
 
-import json
-import os
-import hashlib
-import secrets
 from typing import Dict, Any
-import psycopg2
 from psycopg2.extras import RealDictCursor
+from shared.db import connection
+from shared import queries
+from shared.http import Router, json_response, error, parse_body
+from shared.ratelimit import Policy, client_ip, enforce
+from shared.passwords import hash_password, verify_password, needs_rehash, dummy_verify
+from shared.tokens import can_issue, issue_token
 
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+router = Router('auth', allow_headers='Content-Type, X-Auth-Token')
 
-def generate_token() -> str:
-    return secrets.token_urlsafe(32)
+login_by_ip = Policy('login_ip', '20/60')
+login_by_email = Policy('login_email', '5/300')
+register_by_ip = Policy('register_ip', '5/3600')
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    method: str = event.get('httpMethod', 'GET')
+    return router.dispatch(event, context)
+
+@router.route('POST')
+def authenticate_user(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    body_data = parse_body(event)
+    action = body_data.get('action')
+    email = body_data.get('email', '').strip()
+    password = body_data.get('password', '')
+    
+    if not email or not password:
+        return error(400, 'Email и пароль обязательны')
     
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-Auth-Token',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
+    # Without a signing key no session can be issued, so nothing is written or rehashed
+    if not can_issue():
+        return error(503, 'Вход временно недоступен')
     
-    if method != 'POST':
-        return {
-            'statusCode': 405,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Method not allowed'}),
-            'isBase64Encoded': False
-        }
+    if action == 'login':
+        enforce([(login_by_ip, client_ip(event)), (login_by_email, email.lower())])
+        return login(email, password)
     
-    try:
-        body_data = json.loads(event.get('body', '{}'))
-        action = body_data.get('action')
-        email = body_data.get('email', '').strip()
-        password = body_data.get('password', '')
+    if action == 'register':
+        name = body_data.get('name', '').strip()
         
-        if not email or not password:
-            return {
-                'statusCode': 400,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Email и пароль обязательны'}),
-                'isBase64Encoded': False
-            }
+        if not name:
+            return error(400, 'Имя обязательно')
         
-        database_url = os.environ.get('DATABASE_URL')
-        conn = psycopg2.connect(database_url)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        enforce([(register_by_ip, client_ip(event))])
+        return register(email, password, name)
+    
+    return error(400, 'Неверное действие. Используйте "login" или "register"')
+
+def login(email: str, password: str) -> Dict[str, Any]:
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        queries.execute(cur, 'user_by_email', (email,))
+        user = cur.fetchone()
         
-        if action == 'login':
-            password_hash = hash_password(password)
-            email_escaped = email.replace("'", "''")
-            cur.execute(
-                f"SELECT id, email, name, role FROM t_p57800500_anime_tattoo_website.users WHERE email = '{email_escaped}' AND password_hash = '{password_hash}'"
-            )
-            user = cur.fetchone()
-            
-            if not user:
-                cur.close()
-                conn.close()
-                return {
-                    'statusCode': 401,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Неверный email или пароль'}),
-                    'isBase64Encoded': False
-                }
-            
-            token = generate_token()
-            
-            cur.close()
-            conn.close()
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
-                    'user': dict(user),
-                    'token': token
-                }),
-                'isBase64Encoded': False
-            }
+        if not user:
+            dummy_verify(password)
         
-        elif action == 'register':
-            name = body_data.get('name', '').strip()
-            
-            if not name:
-                cur.close()
-                conn.close()
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Имя обязательно'}),
-                    'isBase64Encoded': False
-                }
-            
-            email_escaped = email.replace("'", "''")
-            cur.execute(
-                f"SELECT id FROM t_p57800500_anime_tattoo_website.users WHERE email = '{email_escaped}'"
-            )
-            existing_user = cur.fetchone()
-            
-            if existing_user:
-                cur.close()
-                conn.close()
-                return {
-                    'statusCode': 409,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Пользователь с таким email уже существует'}),
-                    'isBase64Encoded': False
-                }
-            
-            password_hash = hash_password(password)
-            name_escaped = name.replace("'", "''")
-            
-            cur.execute(
-                f"INSERT INTO t_p57800500_anime_tattoo_website.users (email, password_hash, name, role) VALUES ('{email_escaped}', '{password_hash}', '{name_escaped}', 'client') RETURNING id, email, name, role"
-            )
-            new_user = cur.fetchone()
-            conn.commit()
-            
-            token = generate_token()
-            
-            cur.close()
-            conn.close()
-            
-            return {
-                'statusCode': 201,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({
-                    'user': dict(new_user),
-                    'token': token
-                }),
-                'isBase64Encoded': False
-            }
+        if not user or not verify_password(password, user['password_hash']):
+            return error(401, 'Неверный email или пароль')
         
-        else:
-            cur.close()
-            conn.close()
-            return {
-                'statusCode': 400,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Неверное действие. Используйте "login" или "register"'}),
-                'isBase64Encoded': False
-            }
+        stored_hash = user.pop('password_hash')
+        if needs_rehash(stored_hash):
+            queries.execute(cur, 'user_rehash', (user['id'], stored_hash, hash_password(password)))
+            conn.commit()
+    
+    return json_response(200, {
+        'user': user,
+        'token': issue_token(user['id'], user['role'])
+    })
+
+def register(email: str, password: str, name: str) -> Dict[str, Any]:
+    password_hash = hash_password(password)
+    
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        queries.execute(cur, 'user_register', (email, password_hash, name))
+        new_user = cur.fetchone()
+        conn.commit()
+    
+    if not new_user:
+        return error(409, 'Пользователь с таким email уже существует')
     
-    except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': f'Ошибка сервера: {str(e)}'}),
-            'isBase64Encoded': False
-        }
\ No newline at end of file
+    return json_response(201, {
+        'user': new_user,
+        'token': issue_token(new_user['id'], new_user['role'])
+    })
@@ -0,0 +1,3 @@
+'''
+Business: Micro-benchmarks for backend hot paths, run from backend/ as "python -m benchmarks.<name>"
+'''
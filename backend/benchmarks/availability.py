@@ -0,0 +1,69 @@
+'''
+Business: Benchmark of booking conflict checks - per-day interval index against a linear scan over all bookings
+Args: --months N (default 6), --per-day N bookings (default 3), --queries N (default 20000)
+Returns: prints microseconds per overlap check and per free-slot search for both strategies
+'''
+
+import argparse
+import random
+import timeit
+from datetime import datetime, timedelta
+from typing import List
+from shared.availability import DayIndex, Interval
+
+
+def generate(months: int, per_day: int, seed: int = 7) -> List[Interval]:
+    rng = random.Random(seed)
+    first = datetime(2025, 1, 1)
+    bookings = []
+    for offset in range(months * 30):
+        day = first + timedelta(days=offset)
+        for _ in range(per_day):
+            start = day + timedelta(hours=rng.randint(10, 18))
+            bookings.append((start, start + timedelta(hours=rng.choice((2, 4)))))
+    return bookings
+
+
+def naive_overlaps(bookings: List[Interval], start: datetime, end: datetime) -> bool:
+    return any(b_start < end and b_end > start for b_start, b_end in bookings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--months', type=int, default=6)
+    parser.add_argument('--per-day', type=int, default=3)
+    parser.add_argument('--queries', type=int, default=20000)
+    args = parser.parse_args()
+
+    bookings = generate(args.months, args.per_day)
+    days = {}
+    for start, end in bookings:
+        days.setdefault(start.date(), []).append((start, end))
+    index = {day: DayIndex(intervals) for day, intervals in days.items()}
+
+    rng = random.Random(11)
+    probes = []
+    for _ in range(args.queries):
+        start = datetime(2025, 1, 1) + timedelta(days=rng.randrange(args.months * 30), hours=rng.randint(10, 19))
+        probes.append((start, start + timedelta(hours=2)))
+
+    mismatches = sum(
+        naive_overlaps(bookings, s, e) != index[s.date()].overlaps(s, e) for s, e in probes if s.date() in index
+    )
+    print(f'{len(bookings)} bookings over {len(days)} days, {args.queries} probes, mismatches: {mismatches}')
+
+    slot = timedelta(hours=2)
+    cases = [
+        ('overlap: linear scan', lambda: [naive_overlaps(bookings, s, e) for s, e in probes]),
+        ('overlap: day index', lambda: [index[s.date()].overlaps(s, e) for s, e in probes]),
+        ('free slots: day index', lambda: [
+            list(index[s.date()].free_slots(s.replace(hour=10), s.replace(hour=21), slot)) for s, _ in probes
+        ]),
+    ]
+    for name, fn in cases:
+        seconds = timeit.timeit(fn, number=1)
+        print(f'{name:<24} {seconds / args.queries * 1e6:10.2f} us/op')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+'''
+Business: Throughput of COPY-based exports against fetching the same rows through a list endpoint style query
+Args: DATABASE_URL env; --rows N seeded orders (default 100000, messages x3, bookings x1), --repeat N (default 3)
+Returns: prints rows per second, output MiB and peak traced memory per dataset, format and compression
+'''
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from typing import Any
+import psycopg2
+from shared.export import DATASETS, FORMATS, build_select, export
+from shared.queries import SCHEMA
+
+
+class CountingSink:
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, data: Any) -> int:
+        self.bytes += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+
+def seed(conn: Any, rows: int) -> None:
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.orders (user_id, service_type, description, status, price, payment_method, created_at)
+            SELECT (SELECT MIN(id) FROM {SCHEMA}.users),
+                   'Тату в стиле аниме',
+                   'Персонаж из Наруто на плече, цветная работа с тенями',
+                   (ARRAY['pending', 'discussing', 'priced', 'paid', 'completed'])[g %% 5 + 1],
+                   15000 + g %% 1000,
+                   CASE WHEN g %% 2 = 0 THEN 'online' ELSE 'cash' END,
+                   now()::timestamp - g * interval '1 minute'
+            FROM generate_series(1, %s) AS g
+        """, (rows,))
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.order_messages (order_id, sender_id, message, created_at)
+            SELECT o.id, o.user_id, 'Сообщение "' || n || E'" с переносом\\nи обратным слешем \\\\', o.created_at
+            FROM {SCHEMA}.orders o, generate_series(1, 3) AS n
+        """)
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.bookings (user_id, service_id, booking_date, ends_at, status, notes)
+            SELECT (SELECT MIN(id) FROM {SCHEMA}.users), (SELECT MIN(id) FROM {SCHEMA}.services),
+                   now()::timestamp + g * interval '1 day', now()::timestamp + g * interval '1 day' + interval '4 hours',
+                   'cancelled', 'Бенчмарк экспорта'
+            FROM generate_series(1, %s) AS g
+        """, (rows,))
+
+
+def fetch_json(conn: Any, dataset: str, out: CountingSink) -> int:
+    with conn.cursor() as cur:
+        query, params = build_select(dataset)
+        cur.execute(query, params)
+        rows = cur.fetchall()
+    out.write(json.dumps(rows, default=str, ensure_ascii=False).encode())
+    return len(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        seed(conn, args.rows)
+        for dataset in DATASETS:
+            print(f'\n{dataset}')
+            variants = [(f'COPY {fmt}{" + gzip" if compress else ""}', fmt, compress)
+                        for fmt in FORMATS for compress in (False, True)]
+            variants.append(('fetchall + json.dumps', None, False))
+            for name, fmt, compress in variants:
+                best = float('inf')
+                for _ in range(args.repeat):
+                    sink = CountingSink()
+                    tracemalloc.start()
+                    started = time.perf_counter()
+                    if fmt:
+                        rows = export(conn, dataset, sink, fmt, compress)
+                    else:
+                        rows = fetch_json(conn, dataset, sink)
+                    best = min(best, time.perf_counter() - started)
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                print(f'  {name:<24} {rows / best:12,.0f} rows/s  {sink.bytes / 2 ** 20:8.1f} MiB  '
+                      f'peak {peak / 2 ** 20:7.1f} MiB')
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
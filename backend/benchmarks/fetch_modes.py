@@ -0,0 +1,100 @@
+'''
+Business: Memory and latency of RealDictCursor lists against tuple-row fetch shapes on a seeded table
+Args: DATABASE_URL env; --sizes (default 10000,100000), --repeat N (default 3)
+Returns: prints best ms and peak traced memory per fetch mode and table size
+'''
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from typing import Any, Callable, List, Tuple
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from shared import http
+from shared.rowsets import fetch_rowset, shape_rows
+
+QUERY = 'SELECT * FROM bench_orders ORDER BY created_at DESC, id DESC'
+
+
+def seed(conn: Any, rows: int) -> None:
+    with conn.cursor() as cur:
+        cur.execute('DROP TABLE IF EXISTS bench_orders')
+        cur.execute("""
+            CREATE TEMP TABLE bench_orders AS
+            SELECT g AS id,
+                   g % 500 + 1 AS user_id,
+                   'Тату в стиле аниме'::varchar(100) AS service_type,
+                   'Персонаж из Наруто на плече, цветная работа с тенями'::text AS description,
+                   (ARRAY['pending', 'discussing', 'priced', 'paid', 'completed'])[g % 5 + 1]::varchar(50) AS status,
+                   (15000 + g)::numeric(10, 2) AS price,
+                   CASE WHEN g % 2 = 0 THEN 'online' END::varchar(50) AS payment_method,
+                   now()::timestamp - g * interval '1 minute' AS created_at,
+                   now()::timestamp - g * interval '1 minute' AS updated_at,
+                   'Анна Клиент'::varchar(255) AS client_name,
+                   'client' || (g % 500) || '@example.com' AS client_email
+            FROM generate_series(1, %s) AS g
+        """, (rows,))
+    conn.commit()
+
+
+def legacy(conn: Any) -> str:
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(QUERY)
+        return json.dumps([dict(r) for r in cur.fetchall()], default=str)
+
+
+def dict_rows(conn: Any) -> str:
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(QUERY)
+        return http.encode(cur.fetchall())
+
+
+def tuple_mode(shape: str) -> Callable[[Any], str]:
+    def run(conn: Any) -> str:
+        with conn.cursor() as cur:
+            cur.execute(QUERY)
+            columns, rows = fetch_rowset(cur)
+        return http.encode(shape_rows(columns, rows, shape))
+    return run
+
+
+MODES: List[Tuple[str, Callable[[Any], str]]] = [
+    ('RealDictCursor + json.dumps(default=str)', legacy),
+    ('RealDictCursor + shared encoder', dict_rows),
+    ('tuples, shape=objects', tuple_mode('objects')),
+    ('tuples, shape=rows', tuple_mode('rows')),
+    ('tuples, shape=columns', tuple_mode('columns')),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10000,100000')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        for size in (int(s) for s in args.sizes.split(',')):
+            seed(conn, size)
+            print(f'\n{size} rows')
+            for name, fn in MODES:
+                timings = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    body = fn(conn)
+                    timings.append(time.perf_counter() - started)
+                tracemalloc.start()
+                fn(conn)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f'  {name:<42} {min(timings) * 1000:9.1f} ms  peak {peak / 2 ** 20:8.1f} MiB  '
+                      f'body {len(body.encode()) / 2 ** 20:7.1f} MiB')
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
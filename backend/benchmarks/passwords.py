@@ -0,0 +1,55 @@
+'''
+Business: Benchmark of password hashing cost per setting against a login latency budget
+Args: --budget-ms (default 100), --rounds N per setting (default 5)
+Returns: prints median ms per hash for each hasher setting and the strongest one within budget
+'''
+
+import argparse
+import statistics
+import time
+from typing import List, Tuple
+from shared.passwords import Hasher, LegacySha256Hasher, Pbkdf2Hasher, ScryptHasher
+
+SETTINGS: List[Tuple[str, Hasher, str]] = [
+    ('sha256 (legacy, unsalted)', LegacySha256Hasher(), ''),
+    ('pbkdf2_sha256 i=200000', Pbkdf2Hasher(200000), 'PASSWORD_HASHER=pbkdf2_sha256 PASSWORD_PBKDF2_ITERATIONS=200000'),
+    ('pbkdf2_sha256 i=600000', Pbkdf2Hasher(600000), 'PASSWORD_HASHER=pbkdf2_sha256 PASSWORD_PBKDF2_ITERATIONS=600000'),
+    ('pbkdf2_sha256 i=1000000', Pbkdf2Hasher(1000000), 'PASSWORD_HASHER=pbkdf2_sha256 PASSWORD_PBKDF2_ITERATIONS=1000000'),
+    ('scrypt n=2^13 r=8 p=1', ScryptHasher(2 ** 13, 8, 1), 'PASSWORD_HASHER=scrypt PASSWORD_SCRYPT_N=8192'),
+    ('scrypt n=2^14 r=8 p=1', ScryptHasher(2 ** 14, 8, 1), 'PASSWORD_HASHER=scrypt PASSWORD_SCRYPT_N=16384'),
+    ('scrypt n=2^15 r=8 p=1', ScryptHasher(2 ** 15, 8, 1), 'PASSWORD_HASHER=scrypt PASSWORD_SCRYPT_N=32768'),
+    ('scrypt n=2^16 r=8 p=1', ScryptHasher(2 ** 16, 8, 1), 'PASSWORD_HASHER=scrypt PASSWORD_SCRYPT_N=65536'),
+]
+
+
+def measure(hasher: Hasher, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        hasher.encode('correct horse battery staple')
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--budget-ms', type=float, default=100.0)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    best = None
+    for name, hasher, env in SETTINGS:
+        ms = measure(hasher, args.rounds)
+        within = ms <= args.budget_ms
+        print(f'{name:<28} {ms:10.3f} ms/hash  {"ok" if within else "over budget"}')
+        if within and env:
+            best = (name, env)
+
+    if best:
+        print(f'\nStrongest setting within {args.budget_ms:g} ms: {best[0]}\n  {best[1]}')
+    else:
+        print(f'\nNo salted setting fits within {args.budget_ms:g} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+'''
+Business: Load test of concurrent registration and login through the auth handler
+Args: DATABASE_URL and AUTH_TOKEN_KEYS env; --workers, --requests, --emails (distinct emails shared by all sign-ups);
+      the auth rate limits are raised unless RATE_LIMIT_* is set, since every call comes from one address
+Returns: prints status counts, latency percentiles and database round-trips per request
+'''
+
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+from shared import instrument
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UNLIMITED = {
+    'RATE_LIMIT_LOGIN_IP': '1000000/1',
+    'RATE_LIMIT_LOGIN_EMAIL': '1000000/1',
+    'RATE_LIMIT_REGISTER_IP': '1000000/1',
+}
+
+
+def load_auth_handler() -> Any:
+    # Policies read their limits when auth/index.py is imported
+    for name, spec in UNLIMITED.items():
+        os.environ.setdefault(name, spec)
+    spec = importlib.util.spec_from_file_location('auth_index', os.path.join(BACKEND_DIR, 'auth', 'index.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.handler
+
+
+def call(handler: Any, body: Dict[str, Any]) -> Tuple[int, float, int]:
+    started = time.perf_counter()
+    with instrument.observe() as records:
+        response = handler({'httpMethod': 'POST', 'body': json.dumps(body)}, None)
+    trips = sum(record['queries'] for record in records)
+    return response['statusCode'], (time.perf_counter() - started) * 1000, trips
+
+
+def report(title: str, results: List[Tuple[int, float, int]]) -> None:
+    statuses = Counter(status for status, _, _ in results)
+    latencies = sorted(ms for _, ms, _ in results)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    trips = statistics.mean(count for _, _, count in results)
+    print(f'{title}: {len(results)} requests, statuses {dict(sorted(statuses.items()))}')
+    print(f'  p50 {quantiles[49]:.1f} ms  p95 {quantiles[94]:.1f} ms  p99 {quantiles[98]:.1f} ms  '
+          f'round-trips/request {trips:.2f}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--emails', type=int, default=10)
+    args = parser.parse_args()
+
+    handler = load_auth_handler()
+    run_id = uuid.uuid4().hex[:8]
+    emails = [f'load-{run_id}-{i}@example.com' for i in range(args.emails)]
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        signups = list(executor.map(
+            lambda i: call(handler, {
+                'action': 'register', 'email': emails[i % len(emails)],
+                'password': 'load-test-password', 'name': 'Load Test',
+            }),
+            range(args.requests),
+        ))
+        logins = list(executor.map(
+            lambda i: call(handler, {
+                'action': 'login', 'email': emails[i % len(emails)], 'password': 'load-test-password',
+            }),
+            range(args.requests),
+        ))
+
+    report('register', signups)
+    report('login', logins)
+
+    created = sum(1 for status, _, _ in signups if status == 201)
+    errors = sum(1 for status, _, _ in signups + logins if status >= 500)
+    print(f'\naccounts created {created} (expected {len(emails)}), server errors {errors} (expected 0)')
+
+
+if __name__ == '__main__':
+    main()
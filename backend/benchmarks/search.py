@@ -0,0 +1,112 @@
+'''
+Business: Latency of ranked full-text/trigram order search against an ILIKE scan on seeded orders and messages
+Args: DATABASE_URL env; --messages N (default 300000), --orders N (default 20000), --repeat N (default 5)
+Returns: prints best and median ms per query for the search endpoint query and the ILIKE baseline
+'''
+
+import argparse
+import importlib.util
+import os
+import statistics
+import time
+from typing import Any, List, Tuple
+import psycopg2
+from shared.queries import SCHEMA
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = ['карп', 'кои', 'рукав', 'дракон', 'сакура', 'наруто', 'волны', 'эскиз', 'цвет', 'контур',
+         'плечо', 'спина', 'предплечье', 'киберпанк', 'неон', 'тени', 'сеанс', 'заживление', 'цена', 'оплата']
+QUERIES = ['карп кои рукав', 'дракон на спине', 'эскиз неон', 'наруто', 'client42@example']
+
+
+def load_orders_module() -> Any:
+    spec = importlib.util.spec_from_file_location('orders_index', os.path.join(BACKEND_DIR, 'orders', 'index.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def seed(conn: Any, orders: int, messages: int) -> None:
+    words = '{' + ','.join(WORDS) + '}'
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.users (email, password_hash, name, role)
+            SELECT 'client' || g || '@example.com', 'x', 'Клиент ' || g, 'client'
+            FROM generate_series(1, 500) AS g
+            ON CONFLICT (email) DO NOTHING
+        """)
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.orders (user_id, service_type, description, status, created_at)
+            SELECT u.id, 'Тату ' || w[1 + g %% 20], 'Хочу ' || w[1 + (g * 7) %% 20] || ' и ' || w[1 + (g * 13) %% 20],
+                   'discussing', now()::timestamp - g * interval '1 hour'
+            FROM generate_series(1, %s) AS g,
+                 LATERAL (SELECT %s::text[] AS w) words,
+                 LATERAL (SELECT id FROM {SCHEMA}.users WHERE email = 'client' || (1 + g %% 500) || '@example.com') u
+        """, (orders, words))
+        cur.execute(f"""
+            WITH seeded AS (
+                SELECT array_agg(id ORDER BY id) AS ids, array_agg(user_id ORDER BY id) AS owners
+                FROM (SELECT id, user_id FROM {SCHEMA}.orders ORDER BY id DESC LIMIT %s) o
+            )
+            INSERT INTO {SCHEMA}.order_messages (order_id, sender_id, message)
+            SELECT s.ids[1 + g %% cardinality(s.ids)], s.owners[1 + g %% cardinality(s.ids)],
+                   'Сообщение про ' || w[1 + g %% 20] || ', ' || w[1 + (g * 3) %% 20] || ' и ' || w[1 + (g * 11) %% 20]
+            FROM generate_series(1, %s) AS g, seeded s, LATERAL (SELECT %s::text[] AS w) words
+        """, (orders, messages, words))
+        cur.execute(f'ANALYZE {SCHEMA}.orders')
+        cur.execute(f'ANALYZE {SCHEMA}.order_messages')
+        cur.execute(f'ANALYZE {SCHEMA}.users')
+
+
+def ilike_baseline(text: str) -> Tuple[str, List[str]]:
+    pattern = f'%{text}%'
+    return f"""
+        SELECT DISTINCT o.id, o.created_at
+        FROM {SCHEMA}.orders o
+        JOIN {SCHEMA}.users u ON o.user_id = u.id
+        LEFT JOIN {SCHEMA}.order_messages m ON m.order_id = o.id
+        WHERE o.description ILIKE %s OR m.message ILIKE %s OR u.name ILIKE %s OR u.email ILIKE %s
+        ORDER BY o.created_at DESC, o.id DESC
+        LIMIT 21
+    """, [pattern] * 4
+
+
+def timed(conn: Any, query: str, params: List[Any], repeat: int) -> List[float]:
+    timings = []
+    with conn.cursor() as cur:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cur.execute(query, params)
+            cur.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=300000)
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    orders = load_orders_module()
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        started = time.perf_counter()
+        seed(conn, args.orders, args.messages)
+        print(f'seeded {args.orders} orders and {args.messages} messages in {time.perf_counter() - started:.1f} s '
+              f'(search vectors maintained on write)')
+        for text in QUERIES:
+            query, params = orders.build_search_query(orders.parse_search_params({'q': text, 'limit': '20'}), None)
+            search = timed(conn, query, params, args.repeat)
+            baseline = timed(conn, *ilike_baseline(text), args.repeat)
+            print(f'  {text!r:<22} search best {min(search):8.1f} ms  median {statistics.median(search):8.1f} ms  |  '
+                  f'ILIKE best {min(baseline):8.1f} ms  median {statistics.median(baseline):8.1f} ms')
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
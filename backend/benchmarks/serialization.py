@@ -0,0 +1,59 @@
+'''
+Business: Benchmark of order list serialization - legacy json.dumps(default=str) against shared.http encoders
+Args: --rows N (default 10000), --repeat N (default 5)
+Returns: prints best ms per encode and output size for each encoder
+'''
+
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Tuple
+from shared import http
+
+
+def make_orders(count: int) -> List[Dict[str, Any]]:
+    started = datetime(2024, 1, 1, 12, 0, 0)
+    return [
+        {
+            'id': i,
+            'user_id': i % 500 + 1,
+            'service_type': 'Тату в стиле аниме',
+            'description': 'Персонаж из Наруто на плече, цветная работа с тенями',
+            'status': ('pending', 'discussing', 'priced', 'paid', 'completed')[i % 5],
+            'price': Decimal('15000.00') + i,
+            'payment_method': 'online' if i % 2 else None,
+            'created_at': started + timedelta(minutes=i),
+            'updated_at': started + timedelta(minutes=i, seconds=30),
+            'client_name': 'Анна Клиент',
+            'client_email': f'client{i % 500}@example.com',
+        }
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    orders = make_orders(args.rows)
+    encoders: List[Tuple[str, Callable[[], str]]] = [
+        ('legacy json.dumps(default=str)', lambda: json.dumps([dict(o) for o in orders], default=str)),
+        ('shared.http stdlib encoder', lambda: http.encode_stdlib(orders)),
+    ]
+    if http.orjson is not None:
+        encoders.append(('shared.http orjson encoder', lambda: http.encode(orders)))
+    else:
+        print('orjson is not installed, skipping the orjson encoder')
+
+    for name, fn in encoders:
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        size = len(fn().encode())
+        print(f'{name:<32} {best * 1000:9.2f} ms  {size / 1024:9.1f} KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+'''
+Business: Benchmark of signed session token issue and verify cost per request
+Args: --iterations N (default 100000)
+Returns: prints microseconds per issue/verify/reject and verifies per second
+'''
+
+import argparse
+import timeit
+from shared import tokens
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=100000)
+    args = parser.parse_args()
+
+    tokens.load_keys([('bench2', b'b' * 32), ('bench1', b'a' * 32)])
+    token = tokens.issue_token(42, 'client', ttl=3600)
+    kid, payload, _ = token.split('.')
+    forged = f'{kid}.{payload}.AAAA'
+    rotated = tokens.issue_token(42, 'client', ttl=3600).replace('bench2.', 'retired.', 1)
+
+    cases = [
+        ('issue', lambda: tokens.issue_token(42, 'client', ttl=3600)),
+        ('verify', lambda: tokens.verify_token(token)),
+        ('reject forged signature', lambda: tokens.verify_token(forged)),
+        ('reject retired kid', lambda: tokens.verify_token(rotated)),
+    ]
+    for name, fn in cases:
+        seconds = timeit.timeit(fn, number=args.iterations)
+        per_op_us = seconds / args.iterations * 1e6
+        print(f'{name:<26} {per_op_us:8.2f} us/op  {args.iterations / seconds:12,.0f} ops/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,171 +1,236 @@
 '''
 Business: Manage bookings - create, list, update status
-Args: event with httpMethod, body (user_id, service_id, booking_date, notes)
-Returns: HTTP response with booking data or list of bookings
+Args: event with httpMethod, headers (X-Auth-Token, Idempotency-Key), body (user_id, service_id, booking_date, notes),
+      queryStringParameters (available_from, available_to, service_id or minutes for free slots)
+Returns: HTTP response with booking data, list of bookings or free slots
 '''
 
-import json
-import os
-from typing import Dict, Any
-from datetime import datetime
-import psycopg2
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable
 from psycopg2.extras import RealDictCursor
+from shared.availability import ACTIVE_STATUSES, Interval, build_index, lock_keys, slot_minutes
+from shared.cache import TTLCache
+from shared.db import connection
+from shared.http import HttpError, Router, json_response, error, parse_body, parse_int
+from shared.idempotency import by_principal, idempotent
+from shared.rowsets import parse_shape, fetch_rowset, shape_rows
+from shared.principal import require_identity, resolve_principal
+
+MAX_AVAILABILITY_DAYS = 62
+MAX_SLOT_MINUTES = 12 * 60
+
+router = Router('bookings', allow_headers='Content-Type, X-Auth-Token, X-User-Id, Idempotency-Key')
+service_slots = TTLCache(max_size=256, ttl=300)
+
+def load_intervals(cur: Any, day_start: datetime, day_end: datetime) -> Iterable[Interval]:
+    cur.execute(
+        """SELECT booking_date, ends_at FROM t_p57800500_anime_tattoo_website.bookings 
+           WHERE status IN %s AND booking_date < %s AND ends_at > %s""",
+        (ACTIVE_STATUSES, day_end, day_start)
+    )
+    return [(row['booking_date'], row['ends_at']) for row in cur.fetchall()]
+
+availability = build_index(load_intervals)
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    method: str = event.get('httpMethod', 'GET')
+    return router.dispatch(event, context)
+
+def current_user(cur: Any, identity: Dict[str, Any]) -> Dict[str, Any]:
+    user = resolve_principal(cur, identity)
+    if not user:
+        raise HttpError(401, 'Требуется авторизация')
+    return user
+
+def is_client(user: Dict[str, Any]) -> bool:
+    return user['role'] != 'master'
+
+def parse_moment(value: Any) -> datetime:
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        raise HttpError(400, f'Неверная дата: {value}')
+
+def parse_service_id(value: Any) -> int:
+    service_id = parse_int(value, 'service_id')
+    if service_id < 1:
+        raise HttpError(400, 'Неверный параметр service_id')
+    return service_id
+
+def parse_slot_minutes(value: Any) -> int:
+    minutes = parse_int(value, 'minutes')
+    if not 1 <= minutes <= MAX_SLOT_MINUTES:
+        raise HttpError(400, f'minutes должен быть от 1 до {MAX_SLOT_MINUTES}')
+    return minutes
+
+def service_slot(cur: Any, service_id: int) -> timedelta:
+    minutes = service_slots.get(service_id)
+    if minutes is None:
+        cur.execute(
+            "SELECT duration FROM t_p57800500_anime_tattoo_website.services WHERE id = %s",
+            (service_id,)
+        )
+        service = cur.fetchone()
+        if not service:
+            raise HttpError(404, 'Услуга не найдена')
+        minutes = slot_minutes(service['duration'])
+        service_slots.set(service_id, minutes)
+    return timedelta(minutes=minutes)
+
+def lock_slot(cur: Any, start: datetime, end: datetime) -> None:
+    for namespace, day in lock_keys(start, end):
+        cur.execute("SELECT pg_advisory_xact_lock(%s, %s)", (namespace, day))
+
+def has_conflict(cur: Any, start: datetime, end: datetime, exclude_id: int = 0) -> bool:
+    cur.execute(
+        """SELECT 1 FROM t_p57800500_anime_tattoo_website.bookings 
+           WHERE status IN %s AND booking_date < %s AND ends_at > %s AND id <> %s 
+           LIMIT 1""",
+        (ACTIVE_STATUSES, end, start, exclude_id)
+    )
+    return cur.fetchone() is not None
+
+@router.route('GET')
+def get_bookings(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    query_params = event.get('queryStringParameters') or {}
     
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-Auth-Token, X-User-Id',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
+    if query_params.get('available_from'):
+        return list_free_slots(query_params)
     
-    try:
-        database_url = os.environ.get('DATABASE_URL')
-        conn = psycopg2.connect(database_url)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+    return list_bookings(event, context)
+
+@require_identity
+def list_bookings(event: Dict[str, Any], identity: Dict[str, Any]) -> Dict[str, Any]:
+    query_params = event.get('queryStringParameters') or {}
+    status = query_params.get('status')
+    shape = parse_shape(query_params)
+    
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        user = current_user(cur, identity)
+        user_id = user['id'] if is_client(user) else query_params.get('user_id')
+        
+        query = """
+            SELECT b.id, b.user_id, b.service_id, b.booking_date, b.ends_at, b.status, b.notes, b.created_at,
+                   s.name as service_name, s.price_from, s.price_to, s.duration,
+                   u.name as client_name, u.email as client_email
+            FROM t_p57800500_anime_tattoo_website.bookings b
+            LEFT JOIN t_p57800500_anime_tattoo_website.services s ON b.service_id = s.id
+            LEFT JOIN t_p57800500_anime_tattoo_website.users u ON b.user_id = u.id
+            WHERE 1=1
+        """
+        params = []
+        
+        if user_id:
+            query += " AND b.user_id = %s"
+            params.append(int(user_id))
+        
+        if status:
+            query += " AND b.status = %s"
+            params.append(status)
+        
+        query += " ORDER BY b.booking_date DESC"
+        
+        with conn.cursor() as rows_cur:
+            rows_cur.execute(query, params)
+            columns, rows = fetch_rowset(rows_cur)
+    
+    return json_response(200, shape_rows(columns, rows, shape))
+
+def list_free_slots(query_params: Dict[str, Any]) -> Dict[str, Any]:
+    start = parse_moment(query_params['available_from'])
+    end = parse_moment(query_params.get('available_to') or (start + timedelta(days=7)).isoformat())
+    
+    if end <= start or end - start > timedelta(days=MAX_AVAILABILITY_DAYS):
+        return error(400, f'Интервал поиска должен быть от 0 до {MAX_AVAILABILITY_DAYS} дней')
+    
+    service_id = parse_service_id(query_params['service_id']) if query_params.get('service_id') else None
+    minutes = parse_slot_minutes(query_params['minutes']) if query_params.get('minutes') else slot_minutes(None)
+    
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        length = service_slot(cur, service_id) if service_id is not None else timedelta(minutes=minutes)
+        slots = availability.free_slots(cur, start, end, length)
+    
+    return json_response(200, {
+        'slot_minutes': int(length.total_seconds() // 60),
+        'slots': [{'start': slot_start, 'end': slot_end} for slot_start, slot_end in slots]
+    })
+
+@router.route('POST')
+@require_identity
+@idempotent('bookings', by_principal)
+def create_booking(event: Dict[str, Any], identity: Dict[str, Any], conn: Any) -> Dict[str, Any]:
+    body_data = parse_body(event)
+    service_id = body_data.get('service_id')
+    booking_date = body_data.get('booking_date')
+    notes = body_data.get('notes', '')
+    
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        user = current_user(cur, identity)
+        user_id = user['id'] if is_client(user) else body_data.get('user_id')
+        
+        if not all([user_id, service_id, booking_date]):
+            return error(400, 'user_id, service_id и booking_date обязательны')
+        
+        user_id = parse_int(user_id, 'user_id')
+        service_id = parse_service_id(service_id)
+        start = parse_moment(booking_date)
+        end = start + service_slot(cur, service_id)
+        
+        lock_slot(cur, start, end)
+        if has_conflict(cur, start, end):
+            return error(409, 'Это время уже занято')
+        
+        cur.execute(
+            """INSERT INTO t_p57800500_anime_tattoo_website.bookings 
+               (user_id, service_id, booking_date, ends_at, notes, status) 
+               VALUES (%s, %s, %s, %s, %s, 'pending') 
+               RETURNING id, user_id, service_id, booking_date, ends_at, status, notes, created_at""",
+            (user_id, service_id, start, end, notes)
+        )
+        new_booking = cur.fetchone()
+    
+    conn.after_commit.append(lambda: availability.record(start, end))
+    return json_response(201, new_booking)
+
+@router.route('PUT')
+@require_identity
+def update_booking_status(event: Dict[str, Any], identity: Dict[str, Any]) -> Dict[str, Any]:
+    body_data = parse_body(event)
+    booking_id = body_data.get('id')
+    status = body_data.get('status')
+    
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        if is_client(current_user(cur, identity)):
+            return error(403, 'Доступ запрещен')
+        
+        if not booking_id or not status:
+            return error(400, 'id и status обязательны')
         
-        if method == 'GET':
-            query_params = event.get('queryStringParameters') or {}
-            user_id = query_params.get('user_id')
-            status = query_params.get('status')
-            
-            query = """
-                SELECT b.*, s.name as service_name, s.price, s.duration, 
-                       u.name as client_name, u.email as client_email
-                FROM t_p57800500_anime_tattoo_website.bookings b
-                LEFT JOIN t_p57800500_anime_tattoo_website.services s ON b.service_id = s.id
-                LEFT JOIN t_p57800500_anime_tattoo_website.users u ON b.user_id = u.id
-                WHERE 1=1
-            """
-            params = []
-            
-            if user_id:
-                query += " AND b.user_id = %s"
-                params.append(int(user_id))
-            
-            if status:
-                query += " AND b.status = %s"
-                params.append(status)
-            
-            query += " ORDER BY b.booking_date DESC"
-            
-            cur.execute(query, params)
-            bookings = cur.fetchall()
-            
-            cur.close()
-            conn.close()
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps([dict(b) for b in bookings], default=str),
-                'isBase64Encoded': False
-            }
+        cur.execute(
+            """SELECT booking_date, ends_at, status FROM t_p57800500_anime_tattoo_website.bookings 
+               WHERE id = %s 
+               FOR UPDATE""",
+            (booking_id,)
+        )
+        booking = cur.fetchone()
         
-        elif method == 'POST':
-            body_data = json.loads(event.get('body', '{}'))
-            user_id = body_data.get('user_id')
-            service_id = body_data.get('service_id')
-            booking_date = body_data.get('booking_date')
-            notes = body_data.get('notes', '')
-            
-            if not all([user_id, service_id, booking_date]):
-                cur.close()
-                conn.close()
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'user_id, service_id и booking_date обязательны'}),
-                    'isBase64Encoded': False
-                }
-            
-            cur.execute(
-                """INSERT INTO t_p57800500_anime_tattoo_website.bookings 
-                   (user_id, service_id, booking_date, notes, status) 
-                   VALUES (%s, %s, %s, %s, 'pending') 
-                   RETURNING id, user_id, service_id, booking_date, status, notes, created_at""",
-                (user_id, service_id, booking_date, notes)
-            )
-            new_booking = cur.fetchone()
-            conn.commit()
-            
-            cur.close()
-            conn.close()
-            
-            return {
-                'statusCode': 201,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps(dict(new_booking), default=str),
-                'isBase64Encoded': False
-            }
+        if not booking:
+            return error(404, 'Запись не найдена')
         
-        elif method == 'PUT':
-            body_data = json.loads(event.get('body', '{}'))
-            booking_id = body_data.get('id')
-            status = body_data.get('status')
-            
-            if not booking_id or not status:
-                cur.close()
-                conn.close()
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'id и status обязательны'}),
-                    'isBase64Encoded': False
-                }
-            
-            cur.execute(
-                """UPDATE t_p57800500_anime_tattoo_website.bookings 
-                   SET status = %s 
-                   WHERE id = %s 
-                   RETURNING id, user_id, service_id, booking_date, status, notes, created_at""",
-                (status, booking_id)
-            )
-            updated_booking = cur.fetchone()
-            conn.commit()
-            
-            if not updated_booking:
-                cur.close()
-                conn.close()
-                return {
-                    'statusCode': 404,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Запись не найдена'}),
-                    'isBase64Encoded': False
-                }
-            
-            cur.close()
-            conn.close()
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps(dict(updated_booking), default=str),
-                'isBase64Encoded': False
-            }
+        start, end = booking['booking_date'], booking['ends_at']
+        if status in ACTIVE_STATUSES and booking['status'] not in ACTIVE_STATUSES:
+            lock_slot(cur, start, end)
+            if has_conflict(cur, start, end, exclude_id=int(booking_id)):
+                return error(409, 'Это время уже занято')
         
-        else:
-            cur.close()
-            conn.close()
-            return {
-                'statusCode': 405,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Method not allowed'}),
-                'isBase64Encoded': False
-            }
+        cur.execute(
+            """UPDATE t_p57800500_anime_tattoo_website.bookings 
+               SET status = %s 
+               WHERE id = %s 
+               RETURNING id, user_id, service_id, booking_date, ends_at, status, notes, created_at""",
+            (status, booking_id)
+        )
+        updated_booking = cur.fetchone()
+        conn.commit()
     
-    except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': f'Ошибка сервера: {str(e)}'}),
-            'isBase64Encoded': False
-        }
+    availability.invalidate(start, end)
+    return json_response(200, updated_booking)
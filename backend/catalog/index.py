@@ -0,0 +1,124 @@
+'''
+Business: Public catalog of portfolio works, services and reviews served from an in-process snapshot
+Args: event with httpMethod, queryStringParameters (resource: portfolio|services|reviews|all, category), headers (If-None-Match)
+Returns: HTTP response with catalog data, strong ETag and Cache-Control, or 304 when unchanged
+'''
+
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from psycopg2.extras import RealDictCursor
+from shared.db import connection
+from shared.http import Router, error, get_header, raw_response, encode
+
+RESOURCES = ('portfolio', 'services', 'reviews')
+
+router = Router('catalog', allow_headers='Content-Type, If-None-Match')
+
+class Snapshot:
+    def __init__(self, version: int, data: Dict[str, List[Dict[str, Any]]]):
+        self.version = version
+        self.data = data
+        self.checked_at = time.monotonic()
+        self._bodies: Dict[Tuple[str, Optional[str]], Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def body(self, resource: str, category: Optional[str]) -> Tuple[str, str]:
+        key = (resource, category)
+        cached = self._bodies.get(key)
+        if cached is None:
+            if resource == 'all':
+                payload: Any = {'version': self.version, **self.data}
+            else:
+                payload = self.data[resource]
+            if category is not None:
+                works = [w for w in self.data['portfolio'] if w['category'] == category]
+                payload = {**payload, 'portfolio': works} if resource == 'all' else works
+            body = encode(payload)
+            etag = '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"'
+            cached = (body, etag)
+            with self._lock:
+                if len(self._bodies) < 256:
+                    self._bodies[key] = cached
+        return cached
+
+_snapshot: Optional[Snapshot] = None
+_snapshot_lock = threading.Lock()
+
+def check_interval() -> float:
+    return float(os.environ.get('CATALOG_CHECK_INTERVAL', '30'))
+
+def load_snapshot(cur: Any) -> Snapshot:
+    cur.execute(
+        """SELECT
+               (SELECT version FROM t_p57800500_anime_tattoo_website.catalog_versions WHERE name = 'catalog') AS version,
+               (SELECT COALESCE(json_agg(p ORDER BY p.id), '[]'::json) FROM (
+                   SELECT id, title, description, image_url, category, created_at
+                   FROM t_p57800500_anime_tattoo_website.portfolio) p) AS portfolio,
+               (SELECT COALESCE(json_agg(s ORDER BY s.id), '[]'::json) FROM (
+                   SELECT id, name, description, price_from, price_to, duration
+                   FROM t_p57800500_anime_tattoo_website.services) s) AS services,
+               (SELECT COALESCE(json_agg(r ORDER BY r.created_at DESC, r.id DESC), '[]'::json) FROM (
+                   SELECT id, client_name, rating, comment, image_url, created_at
+                   FROM t_p57800500_anime_tattoo_website.reviews) r) AS reviews"""
+    )
+    row = cur.fetchone()
+    return Snapshot(row['version'], {resource: row[resource] for resource in RESOURCES})
+
+def refresh(snapshot: Optional[Snapshot]) -> Snapshot:
+    global _snapshot
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        if snapshot is not None:
+            cur.execute(
+                "SELECT version FROM t_p57800500_anime_tattoo_website.catalog_versions WHERE name = 'catalog'"
+            )
+            if cur.fetchone()['version'] == snapshot.version:
+                snapshot.checked_at = time.monotonic()
+                conn.rollback()
+                return snapshot
+        _snapshot = load_snapshot(cur)
+        conn.rollback()
+    return _snapshot
+
+def get_snapshot() -> Snapshot:
+    snapshot = _snapshot
+    if snapshot is not None and time.monotonic() - snapshot.checked_at < check_interval():
+        return snapshot
+    
+    if not _snapshot_lock.acquire(blocking=snapshot is None):
+        return snapshot
+    try:
+        if _snapshot is not snapshot and _snapshot is not None:
+            return _snapshot
+        return refresh(snapshot)
+    finally:
+        _snapshot_lock.release()
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    return router.dispatch(event, context)
+
+@router.route('GET')
+def get_catalog(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    params = event.get('queryStringParameters') or {}
+    resource = params.get('resource') or 'all'
+    category = params.get('category') or None
+    
+    if resource not in RESOURCES and resource != 'all':
+        return error(400, f'Неизвестный раздел каталога: {resource}')
+    
+    if category is not None and resource not in ('portfolio', 'all'):
+        return error(400, 'Фильтр category доступен только для portfolio')
+    
+    body, etag = get_snapshot().body(resource, category)
+    headers = {
+        'ETag': etag,
+        'Cache-Control': os.environ.get('CATALOG_CACHE_CONTROL', 'public, max-age=60, stale-while-revalidate=600'),
+    }
+    
+    if_none_match = get_header(event.get('headers'), 'If-None-Match') or ''
+    if etag in (tag.strip() for tag in if_none_match.split(',')) or if_none_match.strip() == '*':
+        return raw_response(304, '', 'application/json', headers)
+    
+    return raw_response(200, body, 'application/json', headers)
@@ -0,0 +1,27 @@
+'''
+Business: Drain the contact form spool into contact_messages - also replays files left by a crashed drain
+Args: --dir spool directory (default CONTACT_SPOOL_DIR), --batch-size N (default CONTACT_SPOOL_BATCH)
+Returns: prints drained files, records, batches and skipped corrupt lines
+'''
+
+import argparse
+import os
+import time
+from shared.spool import Spool
+from contact.index import flush_contacts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dir', default=os.environ.get('CONTACT_SPOOL_DIR', '/tmp/contact-spool'))
+    parser.add_argument('--batch-size', type=int, default=int(os.environ.get('CONTACT_SPOOL_BATCH', '200')))
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    stats = Spool(args.dir).drain(flush_contacts, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - started
+    print(', '.join(f'{key}={value}' for key, value in stats.items()) + f', seconds={elapsed:.3f}')
+
+
+if __name__ == '__main__':
+    main()
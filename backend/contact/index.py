@@ -1,86 +1,135 @@
 '''
-Business: Handle contact form submissions
-Args: event with httpMethod, body (name, phone, email, message)
+Business: Handle contact form submissions, directly or through a write-behind spool (CONTACT_INGEST_MODE=spool)
+Args: event with httpMethod, headers (Idempotency-Key), body (name, phone, email, message)
 Returns: HTTP response with success confirmation
 '''
 
-import json
 import os
-from typing import Dict, Any
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from psycopg2.extras import RealDictCursor, execute_values
+from shared.db import connection
+from shared.http import Router, json_response, error, parse_body
+from shared.idempotency import by_client_ip, idempotent, request_key
+from shared.ratelimit import Policy, client_ip, enforce
+from shared.spool import Spool
+
+SUCCESS_MESSAGE = 'Спасибо! Ваша заявка принята. Мы свяжемся с вами в ближайшее время.'
+
+router = Router('contact', allow_headers='Content-Type, Idempotency-Key')
+
+contact_by_ip = Policy('contact_ip', '5/600')
+contact_by_phone = Policy('contact_phone', '3/3600')
+
+_spool: Optional[Spool] = None
+_spool_lock = threading.Lock()
+_drain_lock = threading.Lock()
+
+def spool_mode() -> bool:
+    return os.environ.get('CONTACT_INGEST_MODE', 'direct') == 'spool'
+
+def spool_batch_size() -> int:
+    return int(os.environ.get('CONTACT_SPOOL_BATCH', '200'))
+
+def get_spool() -> Spool:
+    global _spool
+    if _spool is None:
+        with _spool_lock:
+            if _spool is None:
+                _spool = Spool(
+                    os.environ.get('CONTACT_SPOOL_DIR', '/tmp/contact-spool'),
+                    fsync=os.environ.get('CONTACT_SPOOL_FSYNC', '1') == '1',
+                )
+    return _spool
+
+def spooled_at(record: Dict[str, Any]) -> datetime:
+    # Aware timestamps go in as timestamptz and land in the session time zone, like CURRENT_TIMESTAMP
+    # of direct inserts; records spooled before offsets were written carry naive UTC
+    stamp = datetime.fromisoformat(record['created_at'])
+    return stamp if stamp.tzinfo else stamp.replace(tzinfo=timezone.utc)
+
+def flush_contacts(records: List[Dict[str, Any]]) -> None:
+    with connection() as conn, conn.cursor() as cur:
+        execute_values(
+            cur,
+            """INSERT INTO t_p57800500_anime_tattoo_website.contact_messages
+               (submission_id, name, phone, email, message, created_at)
+               VALUES %s
+               ON CONFLICT (submission_id) DO NOTHING""",
+            [
+                (r['submission_id'], r['name'], r['phone'], r['email'], r['message'], spooled_at(r))
+                for r in records
+            ],
+            page_size=len(records)
+        )
+        conn.commit()
+
+def drain_spool() -> Dict[str, int]:
+    if not _drain_lock.acquire(blocking=False):
+        return {'files': 0, 'records': 0, 'batches': 0, 'corrupt': 0, 'busy': 1}
+    try:
+        return get_spool().drain(flush_contacts, batch_size=spool_batch_size())
+    finally:
+        _drain_lock.release()
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    method: str = event.get('httpMethod', 'POST')
+    return router.dispatch(event, context)
+
+@router.route('POST')
+def submit_contact_form(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    body_data = parse_body(event)
+    contact = {
+        'name': body_data.get('name', '').strip(),
+        'phone': body_data.get('phone', '').strip(),
+        'email': body_data.get('email', '').strip(),
+        'message': body_data.get('message', '').strip(),
+    }
     
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': '',
-            'isBase64Encoded': False
-        }
+    if not all([contact['name'], contact['phone'], contact['message']]):
+        return error(400, 'Имя, телефон и сообщение обязательны')
     
-    if method != 'POST':
-        return {
-            'statusCode': 405,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Method not allowed'}),
-            'isBase64Encoded': False
-        }
+    # Limits are checked before the idempotency wrapper, so a throttled request never opens a connection
+    enforce([(contact_by_ip, client_ip(event)), (contact_by_phone, ''.join(ch for ch in contact['phone'] if ch.isdigit()))])
     
-    try:
-        body_data = json.loads(event.get('body', '{}'))
-        name = body_data.get('name', '').strip()
-        phone = body_data.get('phone', '').strip()
-        email = body_data.get('email', '').strip()
-        message = body_data.get('message', '').strip()
-        
-        if not all([name, phone, message]):
-            return {
-                'statusCode': 400,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Имя, телефон и сообщение обязательны'}),
-                'isBase64Encoded': False
-            }
-        
-        database_url = os.environ.get('DATABASE_URL')
-        conn = psycopg2.connect(database_url)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
+    if spool_mode():
+        return spool_contact(event, contact)
+    return store_contact(event, contact)
+
+def spool_contact(event: Dict[str, Any], contact: Dict[str, Any]) -> Dict[str, Any]:
+    # A retried key maps to the same submission_id, which the flush deduplicates with ON CONFLICT
+    key = request_key(event)
+    submission_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f'contact:{by_client_ip(event, contact)}:{key}') if key else uuid.uuid4())
+    
+    spool = get_spool()
+    spool.append({**contact, 'submission_id': submission_id, 'created_at': datetime.now(timezone.utc).isoformat()})
+    if spool.due(spool_batch_size(), float(os.environ.get('CONTACT_SPOOL_MAX_AGE', '5'))):
+        threading.Thread(target=drain_spool, daemon=True).start()
+    
+    return json_response(200, {
+        'success': True,
+        'message': SUCCESS_MESSAGE,
+        'submission_id': submission_id
+    })
+
+@idempotent('contact', by_client_ip)
+def store_contact(event: Dict[str, Any], contact: Dict[str, Any], conn: Any) -> Dict[str, Any]:
+    submission_id = str(uuid.uuid4())
+    
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
         cur.execute(
             """INSERT INTO t_p57800500_anime_tattoo_website.contact_messages 
-               (name, phone, email, message) 
-               VALUES (%s, %s, %s, %s) 
+               (submission_id, name, phone, email, message) 
+               VALUES (%s, %s, %s, %s, %s) 
                RETURNING id, created_at""",
-            (name, phone, email, message)
+            (submission_id, contact['name'], contact['phone'], contact['email'], contact['message'])
         )
         result = cur.fetchone()
-        conn.commit()
-        
-        cur.close()
-        conn.close()
-        
-        return {
-            'statusCode': 200,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({
-                'success': True,
-                'message': 'Спасибо! Ваша заявка принята. Мы свяжемся с вами в ближайшее время.',
-                'id': result['id']
-            }, default=str),
-            'isBase64Encoded': False
-        }
     
-    except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': f'Ошибка сервера: {str(e)}'}),
-            'isBase64Encoded': False
-        }
+    return json_response(200, {
+        'success': True,
+        'message': SUCCESS_MESSAGE,
+        'id': result['id'],
+        'submission_id': submission_id
+    })
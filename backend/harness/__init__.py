@@ -0,0 +1,5 @@
+'''
+Business: Local harness that replays each function's tests.json against a disposable Postgres and load-tests it
+Args: python -m harness replay|load (see --help); --dsn admin DSN or a local initdb/pg_ctl on PATH
+Returns: per-case pass/fail report and per-endpoint latency percentiles, throughput and DB round-trips
+'''
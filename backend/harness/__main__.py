@@ -0,0 +1,132 @@
+'''
+Business: CLI of the local harness - replay tests.json cases and load-test them against a disposable Postgres,
+          check that every function imports from its own folder as it is deployed, or run the helper checks
+          (replay and load also run the checks that need the database)
+Args: replay|load|package|check, --dsn admin DSN (default HARNESS_ADMIN_DSN, else a temporary initdb cluster), --functions,
+      --keep; load also takes --concurrency N (default 16) and --requests N per case (default 200)
+Returns: exit code 1 when a replayed case or a check fails or a function does not import on its own; prints p50/p95/p99, requests/s and round-trips per endpoint
+'''
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+from harness import cases, checks
+from harness.postgres import disposable_database
+from shared.db import get_pool
+
+HARNESS_ENV = {
+    'AUTH_TOKEN_KEYS': 'harness:harness-secret-key-not-for-production',
+    'RATE_LIMIT_LOGIN_IP': '1000000/1',
+    'RATE_LIMIT_LOGIN_EMAIL': '1000000/1',
+    'RATE_LIMIT_REGISTER_IP': '1000000/1',
+    'RATE_LIMIT_CONTACT_IP': '1000000/1',
+    'RATE_LIMIT_CONTACT_PHONE': '1000000/1',
+}
+
+
+def replay(functions: List[str], handlers: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    passed: Dict[str, List[Dict[str, Any]]] = {}
+    failures = 0
+    for function in functions:
+        print(f'\n{function}')
+        passed[function] = []
+        for case in cases.load_cases(function):
+            try:
+                response, ms, trips = cases.call(handlers[function], case)
+                problem = cases.check(case, response)
+            except Exception as e:
+                problem, ms, trips = f'{type(e).__name__}: {e}', 0.0, 0
+            if problem:
+                failures += 1
+                print(f'  FAIL {case["name"]}: {problem}')
+            else:
+                passed[function].append(case)
+                print(f'  ok   {case["name"]} ({ms:.1f} ms, {trips} round-trips)')
+    print(f'\n{sum(len(p) for p in passed.values())} passed, {failures} failed')
+    return passed
+
+
+def check_packaging(functions: List[str]) -> int:
+    env = {key: value for key, value in os.environ.items() if key != 'PYTHONPATH'}
+    failures = 0
+    for function in functions:
+        result = subprocess.run(
+            [sys.executable, '-c', 'import index'],
+            cwd=os.path.join(cases.BACKEND_DIR, function), env=env, capture_output=True, text=True
+        )
+        if result.returncode:
+            failures += 1
+            print(f'  FAIL {function}: {result.stderr.strip().splitlines()[-1]}')
+        else:
+            print(f'  ok   {function}')
+    return failures
+
+
+def percentile(latencies: List[float], q: int) -> float:
+    if len(latencies) == 1:
+        return latencies[0]
+    return statistics.quantiles(latencies, n=100)[q - 1]
+
+
+def load(passed: Dict[str, List[Dict[str, Any]]], handlers: Dict[str, Any], concurrency: int, requests: int) -> None:
+    print(f'\nload: {requests} requests per case, concurrency {concurrency}')
+    print(f'  {"endpoint":<52} {"p50":>8} {"p95":>8} {"p99":>8} {"req/s":>9} {"trips":>6}  statuses')
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for function, function_cases in passed.items():
+            for case in function_cases:
+                handler = handlers[function]
+                started = time.perf_counter()
+                results: List[Tuple[Dict[str, Any], float, int]] = list(
+                    pool.map(lambda _: cases.call(handler, case), range(requests))
+                )
+                elapsed = time.perf_counter() - started
+                latencies = sorted(ms for _, ms, _ in results)
+                statuses = Counter(response['statusCode'] for response, _, _ in results)
+                trips = statistics.mean(count for _, _, count in results)
+                name = f'{function}: {case["name"]}'[:52]
+                print(f'  {name:<52} {percentile(latencies, 50):8.1f} {percentile(latencies, 95):8.1f} '
+                      f'{percentile(latencies, 99):8.1f} {requests / elapsed:9.1f} {trips:6.2f}  '
+                      f'{dict(sorted(statuses.items()))}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('command', choices=('replay', 'load', 'package', 'check'))
+    parser.add_argument('--dsn', default=os.environ.get('HARNESS_ADMIN_DSN'))
+    parser.add_argument('--functions', default=','.join(cases.FUNCTIONS))
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--keep', action='store_true', help='keep the database for inspection')
+    args = parser.parse_args()
+
+    functions = [f for f in args.functions.split(',') if f]
+    if args.command == 'package':
+        sys.exit(1 if check_packaging(functions) else 0)
+    if args.command == 'check':
+        sys.exit(1 if checks.run(checks.CHECKS) else 0)
+
+    with disposable_database(args.dsn, keep=args.keep) as dsn:
+        os.environ.update(HARNESS_ENV)
+        os.environ['DATABASE_URL'] = dsn
+        os.environ.setdefault('DB_POOL_MAX_SIZE', str(max(5, args.concurrency)))
+        handlers = {function: cases.load_handler(function) for function in functions}
+
+        passed = replay(functions, handlers)
+        failed = sum(len(cases.load_cases(f)) for f in functions) - sum(len(p) for p in passed.values())
+        print('\nchecks')
+        failed += checks.run(checks.CHECKS) + checks.run(checks.DATABASE_CHECKS, dsn)
+        if args.command == 'load':
+            load(passed, handlers, args.concurrency, args.requests)
+
+        get_pool().closeall()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+'''
+Business: Load tests.json cases, turn them into handler events and check responses like the deploy-time runner
+Args: function names under backend/, a loaded handler, a case dict (method, path, headers, body, expected*;
+      auth {user, role} signs an X-Auth-Token for that user with the configured AUTH_TOKEN_KEYS)
+Returns: events, case results with status/body mismatches and per-call latency and DB round-trips
+         (taken from the invocation's shared.instrument trace)
+'''
+
+import importlib.util
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+from shared import instrument
+from shared.tokens import issue_token
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNCTIONS = ('auth', 'orders', 'messages', 'bookings', 'contact', 'catalog', 'attachments')
+
+TYPE_PLACEHOLDERS: Dict[str, Callable[[Any], bool]] = {
+    'string': lambda v: isinstance(v, str),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'boolean': lambda v: isinstance(v, bool),
+    'array': lambda v: isinstance(v, list),
+    'object': lambda v: isinstance(v, dict),
+    'any': lambda v: True,
+}
+
+
+def load_cases(function: str) -> List[Dict[str, Any]]:
+    path = os.path.join(BACKEND_DIR, function, 'tests.json')
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get('tests', [])
+
+
+def load_handler(function: str) -> Callable[[Dict[str, Any], Any], Dict[str, Any]]:
+    spec = importlib.util.spec_from_file_location(f'{function}_index', os.path.join(BACKEND_DIR, function, 'index.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.handler
+
+
+def build_event(case: Dict[str, Any]) -> Dict[str, Any]:
+    url = urlsplit(case.get('path') or '/')
+    event: Dict[str, Any] = {
+        'httpMethod': case.get('method', 'GET'),
+        'path': url.path or '/',
+        'headers': dict(case.get('headers') or {}),
+        'queryStringParameters': dict(parse_qsl(url.query)) or case.get('queryStringParameters'),
+        'isBase64Encoded': bool(case.get('isBase64Encoded')),
+    }
+    if case.get('auth'):
+        event['headers']['X-Auth-Token'] = issue_token(case['auth']['user'], case['auth']['role'])
+    if 'body' in case:
+        body = case['body']
+        event['body'] = body if isinstance(body, str) else json.dumps(body, ensure_ascii=False)
+    return event
+
+
+def match(expected: Any, actual: Any, partial: bool, path: str = '$') -> Optional[str]:
+    if isinstance(expected, str) and expected in TYPE_PLACEHOLDERS:
+        return None if TYPE_PLACEHOLDERS[expected](actual) else f'{path}: expected {expected}, got {actual!r}'
+    if isinstance(expected, dict):
+        if not isinstance(actual, dict):
+            return f'{path}: expected object, got {actual!r}'
+        if not partial and set(expected) != set(actual):
+            return f'{path}: keys {sorted(actual)} != {sorted(expected)}'
+        for key, value in expected.items():
+            if key not in actual:
+                return f'{path}.{key}: missing'
+            problem = match(value, actual[key], partial, f'{path}.{key}')
+            if problem:
+                return problem
+        return None
+    if isinstance(expected, list):
+        if not isinstance(actual, list) or (not partial and len(expected) != len(actual)):
+            return f'{path}: expected list of {len(expected)}, got {actual!r}'
+        for i, (item, got) in enumerate(zip(expected, actual)):
+            problem = match(item, got, partial, f'{path}[{i}]')
+            if problem:
+                return problem
+        return None
+    if expected == actual and isinstance(expected, bool) == isinstance(actual, bool):
+        return None
+    return f'{path}: expected {expected!r}, got {actual!r}'
+
+
+def call(handler: Callable[[Dict[str, Any], Any], Dict[str, Any]], case: Dict[str, Any]) -> Tuple[Dict[str, Any], float, int]:
+    event = build_event(case)
+    started = time.perf_counter()
+    with instrument.observe() as records:
+        response = handler(event, None)
+    return response, (time.perf_counter() - started) * 1000, sum(record['queries'] for record in records)
+
+
+def check(case: Dict[str, Any], response: Dict[str, Any]) -> Optional[str]:
+    expected_status = case.get('expectedStatus')
+    if expected_status is not None and response['statusCode'] != expected_status:
+        return f"status {response['statusCode']} != {expected_status}: {str(response.get('body'))[:200]}"
+    matcher = case.get('bodyMatcher', 'exact' if 'expectedBody' in case else 'skip')
+    if matcher == 'skip' or 'expectedBody' not in case:
+        return None
+    try:
+        body = json.loads(response.get('body') or 'null')
+    except ValueError:
+        return f"body is not JSON: {str(response.get('body'))[:200]}"
+    return match(case['expectedBody'], body, matcher == 'partial')
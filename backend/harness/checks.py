@@ -0,0 +1,90 @@
+'''
+Business: Checks of shared helpers that tests.json cases cannot reach through a handler
+Args: none for CHECKS; DATABASE_CHECKS take the DSN of the migrated harness database
+Returns: (name, problem or None) per check, printed like replayed cases
+'''
+
+import io
+from typing import Any, Callable, List, Optional, Tuple
+import psycopg2
+from shared.availability import slot_minutes
+from shared.export import DATASETS, FORMATS, build_select, export
+from shared.queries import SCHEMA
+
+SLOT_MINUTES_CASES = [
+    (None, 240),
+    ('Несколько сеансов', 240),
+    ('1-2 часа', 120),
+    ('4-8 часов', 480),
+    ('1,5 часа', 90),
+    ('1.5 часа', 90),
+    ('2,5-3 часа', 180),
+    ('45 минут', 45),
+]
+
+
+def check_slot_minutes() -> Optional[str]:
+    for duration, expected in SLOT_MINUTES_CASES:
+        minutes = slot_minutes(duration)
+        if minutes != expected:
+            return f'slot_minutes({duration!r}) = {minutes}, expected {expected}'
+    return None
+
+
+def check_export_row_count(dsn: str) -> Optional[str]:
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            # Multi-line text makes CSV rows span several lines; a booking without user or service
+            # must survive the joins. Everything is rolled back afterwards.
+            cur.execute(f"""
+                WITH o AS (
+                    INSERT INTO {SCHEMA}.orders (user_id, service_type, description)
+                    SELECT MIN(id), 'Экспорт', E'Эскиз "по референсу"\\nвторая строка' FROM {SCHEMA}.users
+                    RETURNING id, user_id
+                )
+                INSERT INTO {SCHEMA}.order_messages (order_id, sender_id, message)
+                SELECT o.id, o.user_id, E'Сообщение ' || n || E'\\nс переносом' FROM o, generate_series(1, 3) AS n
+            """)
+            cur.execute(f"""
+                INSERT INTO {SCHEMA}.bookings (user_id, service_id, booking_date, ends_at, status, notes)
+                VALUES (NULL, NULL, now()::timestamp, now()::timestamp + interval '1 hour', 'cancelled', E'без\\nклиента')
+            """)
+            for dataset in DATASETS:
+                query, params = build_select(dataset)
+                cur.execute(f'SELECT count(*) FROM ({query}) t', params)
+                expected = cur.fetchone()[0]
+                for fmt in FORMATS:
+                    for compress in (False, True):
+                        rows = export(conn, dataset, io.BytesIO(), fmt, compress)
+                        if rows != expected:
+                            mode = f'{fmt}{" + gzip" if compress else ""}'
+                            return f'export({dataset!r}, {mode}) reported {rows} rows, query has {expected}'
+    finally:
+        conn.rollback()
+        conn.close()
+    return None
+
+
+CHECKS: List[Tuple[str, Callable[[], Optional[str]]]] = [
+    ('slot_minutes parses ranges and decimal commas', check_slot_minutes),
+]
+
+DATABASE_CHECKS: List[Tuple[str, Callable[[str], Optional[str]]]] = [
+    ('export counts the rows it writes', check_export_row_count),
+]
+
+
+def run(checks: List[Tuple[str, Callable[..., Optional[str]]]], *args: Any) -> int:
+    failures = 0
+    for name, check in checks:
+        try:
+            problem = check(*args)
+        except Exception as e:
+            problem = f'{type(e).__name__}: {e}'
+        if problem:
+            failures += 1
+            print(f'  FAIL {name}: {problem}')
+        else:
+            print(f'  ok   {name}')
+    return failures
@@ -0,0 +1,103 @@
+'''
+Business: Disposable Postgres database seeded from db_migrations/ for the local harness
+Args: admin DSN of a server to create a throwaway database on, or none to start a temporary initdb cluster
+Returns: DSN of a freshly migrated database, dropped (or the cluster removed) on exit
+'''
+
+import glob
+import os
+import re
+import shutil
+import socket
+import subprocess
+import tempfile
+import uuid
+from contextlib import contextmanager
+from typing import ContextManager, Iterator, List, Optional
+import psycopg2
+from psycopg2 import extensions
+from shared.queries import SCHEMA
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                              'db_migrations')
+
+
+def migration_files(directory: str = MIGRATIONS_DIR) -> List[str]:
+    def version(path: str) -> int:
+        return int(re.match(r'V(\d+)__', os.path.basename(path)).group(1))
+    return sorted(glob.glob(os.path.join(directory, 'V*__*.sql')), key=version)
+
+
+def migrate(dsn: str, directory: str = MIGRATIONS_DIR) -> int:
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f'CREATE SCHEMA IF NOT EXISTS {SCHEMA}')
+            cur.execute(f'SET search_path TO {SCHEMA}, public')
+            files = migration_files(directory)
+            for path in files:
+                with open(path, encoding='utf-8') as f:
+                    cur.execute(f.read())
+        conn.commit()
+    finally:
+        conn.close()
+    return len(files)
+
+
+def _with_dbname(dsn: str, dbname: str) -> str:
+    params = extensions.parse_dsn(dsn)
+    params['dbname'] = dbname
+    return extensions.make_dsn(**params)
+
+
+@contextmanager
+def throwaway_database(admin_dsn: str, keep: bool = False) -> Iterator[str]:
+    name = f'harness_{uuid.uuid4().hex[:12]}'
+    admin = psycopg2.connect(admin_dsn)
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cur:
+            cur.execute(f'CREATE DATABASE {name}')
+        dsn = _with_dbname(admin_dsn, name)
+        migrate(dsn)
+        yield dsn
+    finally:
+        if not keep:
+            with admin.cursor() as cur:
+                cur.execute(f'DROP DATABASE IF EXISTS {name} WITH (FORCE)')
+        admin.close()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def temporary_cluster(keep: bool = False) -> Iterator[str]:
+    for tool in ('initdb', 'pg_ctl'):
+        if not shutil.which(tool):
+            raise RuntimeError(f'{tool} not found on PATH; pass --dsn to use an existing server')
+    root = tempfile.mkdtemp(prefix='harness-pg-')
+    data = os.path.join(root, 'data')
+    port = _free_port()
+    subprocess.run(['initdb', '-D', data, '-U', 'postgres', '-A', 'trust', '-E', 'UTF8'],
+                   check=True, stdout=subprocess.DEVNULL)
+    subprocess.run(['pg_ctl', '-D', data, '-l', os.path.join(root, 'postgres.log'), '-w',
+                    '-o', f'-p {port} -k {root} -c listen_addresses=127.0.0.1 -c max_connections=200 -c fsync=off',
+                    'start'], check=True, stdout=subprocess.DEVNULL)
+    try:
+        dsn = f'host=127.0.0.1 port={port} user=postgres dbname=postgres'
+        migrate(dsn)
+        yield dsn
+    finally:
+        subprocess.run(['pg_ctl', '-D', data, '-m', 'immediate', 'stop'], stdout=subprocess.DEVNULL)
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def disposable_database(admin_dsn: Optional[str] = None, keep: bool = False) -> ContextManager[str]:
+    if admin_dsn:
+        return throwaway_database(admin_dsn, keep)
+    return temporary_cluster(keep)
@@ -1,152 +1,211 @@
 '''
-Business: Чат в заказах - отправка и получение сообщений между клиентом и мастером
-Args: event с httpMethod, body, queryStringParameters, headers (X-User-Id)
-Returns: HTTP response с сообщениями или подтверждением отправки
+Business: Чат в заказах - отправка и получение сообщений, отметка о прочтении и непрочитанные по заказам
+Args: event с httpMethod, body (order_id, message, attachment_ids), queryStringParameters (order_id, since_id, since, wait, before_id, limit, inbox),
+      headers (X-Auth-Token)
+Returns: HTTP response с сообщениями, списком непрочитанных, курсором прочтения или подтверждением отправки
 '''
 
-import json
-import os
-from typing import Dict, Any
-import psycopg2
+from typing import Dict, Any, Optional
+from datetime import datetime
 from psycopg2.extras import RealDictCursor
+from shared.db import connection
+from shared.notify import get_listener
+from shared import queries
+from shared.http import HttpError, Router, json_response, raw_response, error, parse_body, parse_int, get_header
+from shared.rowsets import parse_shape, fetch_rowset, shape_rows
+from shared.principal import require_identity, resolve_principal
+
+LONG_POLL_MAX_WAIT = 25
+DEFAULT_HISTORY_PAGE = 30
+MAX_HISTORY_PAGE = 100
+MESSAGE_COLUMNS = ['id', 'order_id', 'sender_id', 'message', 'created_at', 'sender_name', 'sender_role', 'attachments']
+
+router = Router('messages', allow_headers='Content-Type, X-Auth-Token, X-User-Id, If-None-Match')
+
+def is_id(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.isdigit()
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def order_channel(order_id: int) -> str:
+    return f'order_messages_{order_id}'
+
+def wait_for_message(order_id: int, since_id: int, timeout: float) -> bool:
+    # Ожидание идет на общем LISTEN-соединении вне пула, а соединение из пула берется только
+    # на проверку после подписки, поэтому ждущие клиенты не занимают пул и не теряют сообщение,
+    # пришедшее до LISTEN
+    with get_listener().listen(order_channel(order_id)) as notified:
+        with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+            queries.execute(cur, 'messages_last_id', (order_id,))
+            if cur.fetchone()['last_id'] > since_id:
+                return True
+        return notified.wait(timeout)
+
+def check_access(cur: Any, identity: Dict[str, Any], order_id: int) -> Dict[str, Any]:
+    user = resolve_principal(cur, identity)
+    
+    queries.execute(cur, 'order_owner', (order_id,))
+    order = cur.fetchone()
+    
+    if not order:
+        raise HttpError(404, 'Заказ не найден')
+    
+    if not user or (user['role'] != 'master' and order['user_id'] != identity['id']):
+        raise HttpError(403, 'Доступ запрещен')
+    
+    return order
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    method: str = event.get('httpMethod', 'GET')
-    
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': ''
-        }
-    
-    headers = event.get('headers', {})
-    user_id = headers.get('X-User-Id') or headers.get('x-user-id')
-    
-    if not user_id:
-        return {
-            'statusCode': 401,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Требуется авторизация'})
-        }
-    
-    database_url = os.environ.get('DATABASE_URL')
-    conn = psycopg2.connect(database_url)
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+    return router.dispatch(event, context)
+
+@router.route('GET')
+@require_identity
+def get_messages(event: Dict[str, Any], identity: Dict[str, Any]) -> Dict[str, Any]:
+    params = event.get('queryStringParameters') or {}
+    order_id = params.get('order_id')
+    
+    if params.get('inbox'):
+        return get_inbox(identity, parse_shape(params))
+    
+    if not order_id:
+        return error(400, 'Не указан ID заказа')
     
     try:
-        if method == 'GET':
-            params = event.get('queryStringParameters', {})
-            order_id = params.get('order_id')
-            
-            if not order_id:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Не указан ID заказа'})
-                }
-            
-            cur.execute(f"SELECT role FROM t_p57800500_anime_tattoo_website.users WHERE id = {user_id}")
-            user = cur.fetchone()
-            
-            cur.execute(f"SELECT user_id FROM t_p57800500_anime_tattoo_website.orders WHERE id = {order_id}")
-            order = cur.fetchone()
-            
-            if not order:
-                return {
-                    'statusCode': 404,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Заказ не найден'})
-                }
-            
-            if user['role'] != 'master' and order['user_id'] != int(user_id):
-                return {
-                    'statusCode': 403,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Доступ запрещен'})
-                }
-            
-            cur.execute(f"""
-                SELECT m.*, u.name as sender_name, u.role as sender_role
-                FROM t_p57800500_anime_tattoo_website.order_messages m
-                JOIN t_p57800500_anime_tattoo_website.users u ON m.sender_id = u.id
-                WHERE m.order_id = {order_id}
-                ORDER BY m.created_at ASC
-            """)
-            messages = cur.fetchall()
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps([dict(m) for m in messages], default=str)
-            }
+        order_id = int(order_id)
+        since_id = int(params['since_id']) if params.get('since_id') else None
+        since = datetime.fromisoformat(params['since']) if params.get('since') else None
+        wait = min(max(int(params.get('wait') or 0), 0), LONG_POLL_MAX_WAIT)
+        before_id = int(params['before_id']) if params.get('before_id') else None
+        limit = min(max(int(params.get('limit') or DEFAULT_HISTORY_PAGE), 1), MAX_HISTORY_PAGE)
+    except ValueError:
+        return error(400, 'Неверный параметр since_id, since, wait, before_id или limit')
+    
+    shape = parse_shape(params)
+    
+    if before_id is not None:
+        return get_history_page(identity, order_id, before_id, limit, shape)
+    
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        check_access(cur, identity, order_id)
         
-        elif method == 'POST':
-            body_data = json.loads(event.get('body', '{}'))
-            order_id = body_data.get('order_id')
-            message = body_data.get('message', '').replace("'", "''")
-            
-            if not order_id or not message:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Не указан ID заказа или текст сообщения'})
-                }
-            
-            cur.execute(f"SELECT role FROM t_p57800500_anime_tattoo_website.users WHERE id = {user_id}")
-            user = cur.fetchone()
-            
-            cur.execute(f"SELECT user_id, status FROM t_p57800500_anime_tattoo_website.orders WHERE id = {order_id}")
-            order = cur.fetchone()
-            
-            if not order:
-                return {
-                    'statusCode': 404,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Заказ не найден'})
-                }
-            
-            if user['role'] != 'master' and order['user_id'] != int(user_id):
-                return {
-                    'statusCode': 403,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Доступ запрещен'})
-                }
-            
-            cur.execute(f"""
-                INSERT INTO t_p57800500_anime_tattoo_website.order_messages 
-                (order_id, sender_id, message)
-                VALUES ({order_id}, {user_id}, '{message}')
-                RETURNING id, order_id, sender_id, message, created_at
-            """)
-            new_message = cur.fetchone()
-            
-            if order['status'] == 'pending':
-                cur.execute(f"""
-                    UPDATE t_p57800500_anime_tattoo_website.orders 
-                    SET status = 'discussing', updated_at = CURRENT_TIMESTAMP
-                    WHERE id = {order_id}
-                """)
-            
-            conn.commit()
-            
-            return {
-                'statusCode': 201,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps(dict(new_message), default=str)
-            }
+        queries.execute(cur, 'messages_last_id', (order_id,))
+        last_id = cur.fetchone()['last_id']
         
-        return {
-            'statusCode': 405,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Метод не поддерживается'})
-        }
-    
-    finally:
-        cur.close()
-        conn.close()
+        if since_id is None or since_id < last_id or not wait:
+            return thread_response(event, conn, cur, order_id, since_id, since, shape, last_id)
+    
+    wait_for_message(order_id, since_id, wait)
+    
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        queries.execute(cur, 'messages_last_id', (order_id,))
+        return thread_response(event, conn, cur, order_id, since_id, since, shape, cur.fetchone()['last_id'])
+
+def thread_response(event: Dict[str, Any], conn: Any, cur: Any, order_id: int, since_id: Optional[int],
+                    since: Optional[datetime], shape: str, last_id: int) -> Dict[str, Any]:
+    # Тело ответа зависит от выборки (since_id или since) и формы строк, поэтому они входят в ETag.
+    # Миниатюра, ставшая готовой, меняет поле thumb у старого сообщения, поэтому туда же
+    # входит число ожидающих миниатюр
+    if since_id is not None:
+        selector = f'id{since_id}'
+    elif since is not None:
+        selector = f'at{since.isoformat()}'
+    else:
+        selector = 'all'
+    queries.execute(cur, 'messages_pending_thumbs', (order_id,))
+    etag = f'W/"{order_id}-{selector}-{shape}-{last_id}-{cur.fetchone()["pending"]}"'
+    if get_header(event.get('headers'), 'If-None-Match') == etag:
+        return raw_response(304, '', 'application/json', {'ETag': etag})
+    
+    if since_id is not None and since_id >= last_id:
+        columns, rows = MESSAGE_COLUMNS, []
+    else:
+        with conn.cursor() as rows_cur:
+            if since_id is not None:
+                queries.execute(rows_cur, 'messages_since_id', (order_id, since_id))
+            elif since is not None:
+                queries.execute(rows_cur, 'messages_since', (order_id, since))
+            else:
+                queries.execute(rows_cur, 'messages_by_order', (order_id,))
+            columns, rows = fetch_rowset(rows_cur)
+    
+    return json_response(200, shape_rows(columns, rows, shape), {'ETag': etag})
+
+def get_inbox(identity: Dict[str, Any], shape: str) -> Dict[str, Any]:
+    with connection() as conn, conn.cursor() as cur:
+        queries.execute(cur, 'read_cursors_inbox', (identity['id'],))
+        columns, rows = fetch_rowset(cur)
+    
+    return json_response(200, shape_rows(columns, rows, shape))
+
+def get_history_page(identity: Dict[str, Any], order_id: int, before_id: int, limit: int, shape: str) -> Dict[str, Any]:
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        check_access(cur, identity, order_id)
+        
+        with conn.cursor() as rows_cur:
+            queries.execute(rows_cur, 'messages_before_id', (order_id, before_id, limit + 1))
+            columns, rows = fetch_rowset(rows_cur)
+    
+    extra_headers = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        extra_headers = {'X-Before-Id': str(rows[-1][columns.index('id')])}
+    rows.reverse()
+    
+    return json_response(200, shape_rows(columns, rows, shape), extra_headers)
+
+@router.route('POST')
+@require_identity
+def send_message(event: Dict[str, Any], identity: Dict[str, Any]) -> Dict[str, Any]:
+    body_data = parse_body(event)
+    order_id = body_data.get('order_id')
+    message = body_data.get('message', '')
+    attachment_ids = body_data.get('attachment_ids') or []
+    
+    if not order_id or not message:
+        return error(400, 'Не указан ID заказа или текст сообщения')
+    
+    if not isinstance(attachment_ids, list) or not all(is_id(a) for a in attachment_ids):
+        return error(400, 'attachment_ids должен быть списком ID вложений')
+    
+    attachment_ids = [int(a) for a in attachment_ids]
+    order_id = parse_int(order_id, 'order_id')
+    
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        order = check_access(cur, identity, order_id)
+        
+        queries.execute(cur, 'message_insert', (order_id, identity['id'], message))
+        new_message = cur.fetchone()
+        
+        if attachment_ids:
+            queries.execute(cur, 'attachments_link_message', (order_id, new_message['id'], identity['id'], attachment_ids))
+        
+        if order['status'] == 'pending':
+            queries.execute(cur, 'order_mark_discussing', (order_id,))
+        
+        queries.execute(cur, 'read_cursors_on_message', (order_id, identity['id'], new_message['id']))
+        queries.execute(cur, 'message_notify', (order_channel(order_id), str(new_message['id'])))
+        conn.commit()
+    
+    return json_response(201, new_message)
+
+@router.route('PUT')
+@require_identity
+def mark_read(event: Dict[str, Any], identity: Dict[str, Any]) -> Dict[str, Any]:
+    body_data = parse_body(event)
+    order_id = body_data.get('order_id')
+    last_read_id = body_data.get('last_read_id')
+    
+    if not order_id:
+        return error(400, 'Не указан ID заказа')
+    
+    order_id = parse_int(order_id, 'order_id')
+    last_read_id = parse_int(last_read_id, 'last_read_id') if last_read_id is not None else None
+    
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        check_access(cur, identity, order_id)
+        
+        queries.execute(cur, 'read_cursor_mark', (order_id, identity['id'], last_read_id))
+        read_cursor = cur.fetchone()
+        conn.commit()
+    
+    return json_response(200, read_cursor)
\ No newline at end of file
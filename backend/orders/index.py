@@ -1,217 +1,389 @@
 '''
 Business: Управление заказами - создание, просмотр, обновление статуса и цены
-Args: event с httpMethod, body, queryStringParameters, headers (X-User-Id)
-Returns: HTTP response с данными заказа или списком заказов
+Args: event с httpMethod, body, queryStringParameters, headers (X-Auth-Token, Idempotency-Key при создании)
+Returns: HTTP response с данными заказа (с последними сообщениями при ?messages=N), списком заказов,
+         результатами поиска по заказам и переписке (?q=) или сводкой для мастера (?summary=1)
 '''
 
 import json
-import os
-from typing import Dict, Any, Optional
+import base64
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
-import psycopg2
+from decimal import Decimal
 from psycopg2.extras import RealDictCursor
+from shared.db import connection
+from shared import queries
+from shared.http import Router, json_response, error, parse_body, parse_int
+from shared.rowsets import parse_shape, fetch_rowset, shape_rows
+from shared.idempotency import by_principal, idempotent
+from shared.principal import require_identity, resolve_principal
+from shared.order_states import STATUSES, allowed_targets
 
-def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    method: str = event.get('httpMethod', 'GET')
-    
-    if method == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Id',
-                'Access-Control-Max-Age': '86400'
-            },
-            'body': ''
-        }
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_THREAD_MESSAGES = 100
+MIN_SEARCH_LENGTH = 2
+
+router = Router('orders', allow_headers='Content-Type, X-Auth-Token, X-User-Id, Idempotency-Key')
+
+def encode_cursor(created_at: datetime, order_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), order_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token: str) -> Tuple[datetime, int]:
+    raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+    created_at, order_id = json.loads(raw)
+    return datetime.fromisoformat(created_at), int(order_id)
+
+def parse_page_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    # Without limit or cursor the caller gets the whole list, as before pagination
+    if not params.get('limit') and not params.get('cursor'):
+        limit = None
+    else:
+        limit = int(params.get('limit') or DEFAULT_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError('limit must be positive')
+        limit = min(limit, MAX_PAGE_SIZE)
+    return {
+        'limit': limit,
+        'status': params.get('status') or None,
+        'date_from': datetime.fromisoformat(params['date_from']) if params.get('date_from') else None,
+        'date_to': datetime.fromisoformat(params['date_to']) if params.get('date_to') else None,
+        'after': decode_cursor(params['cursor']) if params.get('cursor') else None,
+    }
+
+def build_list_query(page: Dict[str, Any], owner_id: Optional[int]) -> Tuple[str, List[Any]]:
+    query = f"""
+        SELECT o.id, o.user_id, o.service_type, o.description, o.status, o.price,
+               o.payment_method, o.created_at, o.updated_at, o.version,
+               u.name as client_name, u.email as client_email
+        FROM {queries.SCHEMA}.orders o
+        JOIN {queries.SCHEMA}.users u ON o.user_id = u.id
+        WHERE 1=1
+    """
+    params: List[Any] = []
     
-    headers = event.get('headers', {})
-    user_id = headers.get('X-User-Id') or headers.get('x-user-id')
+    if owner_id is not None:
+        query += " AND o.user_id = %s"
+        params.append(owner_id)
     
-    if not user_id:
-        return {
-            'statusCode': 401,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Требуется авторизация'})
-        }
+    if page['status']:
+        query += " AND o.status = %s"
+        params.append(page['status'])
+    
+    if page['date_from']:
+        query += " AND o.created_at >= %s"
+        params.append(page['date_from'])
+    
+    if page['date_to']:
+        query += " AND o.created_at < %s"
+        params.append(page['date_to'])
+    
+    if page['after']:
+        query += " AND (o.created_at, o.id) < (%s, %s)"
+        params.extend(page['after'])
+    
+    query += " ORDER BY o.created_at DESC, o.id DESC"
+    
+    if page['limit'] is not None:
+        query += " LIMIT %s"
+        params.append(page['limit'] + 1)
+    return query, params
+
+def build_summary(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {
+        'orders_by_status': {},
+        'orders_total': 0,
+        'revenue_by_payment_method': {},
+        'revenue_total': 0.0,
+        'pending_bookings': 0,
+        'unread_messages': 0,
+    }
+    for row in rows:
+        metric, key, count = row['metric'], row['key'], row['count']
+        if metric == 'orders_by_status' and count:
+            summary['orders_by_status'][key] = count
+            summary['orders_total'] += count
+        elif metric == 'revenue_by_payment' and count:
+            amount = float(row['amount'])
+            summary['revenue_by_payment_method'][key] = {'orders': count, 'amount': amount}
+            summary['revenue_total'] += amount
+        elif metric in ('pending_bookings', 'unread_messages'):
+            summary[metric] = count
+    return summary
+
+def encode_search_cursor(rank: float, order_id: int) -> str:
+    raw = json.dumps([rank, order_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def parse_search_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    text = (params.get('q') or '').strip()
+    if len(text) < MIN_SEARCH_LENGTH:
+        raise ValueError('query too short')
+    page = parse_page_params({**params, 'cursor': None, 'limit': params.get('limit') or DEFAULT_PAGE_SIZE})
+    if params.get('cursor'):
+        token = params['cursor']
+        rank, order_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        page['after'] = (float(rank), int(order_id))
+    page['text'] = text
+    return page
+
+def build_search_query(page: Dict[str, Any], owner_id: Optional[int]) -> Tuple[str, List[Any]]:
+    query = f"""
+        WITH q AS (
+            SELECT websearch_to_tsquery('russian', %s) AS tsq, %s::text AS raw
+        ),
+        hits AS (
+            SELECT o.id AS order_id, ts_rank_cd(o.search_vector, q.tsq)::float8 AS rank, NULL::integer AS message_id
+            FROM {queries.SCHEMA}.orders o, q
+            WHERE o.search_vector @@ q.tsq
+            UNION ALL
+            SELECT m.order_id, ts_rank_cd(m.search_vector, q.tsq)::float8, m.id
+            FROM {queries.SCHEMA}.order_messages m, q
+            WHERE m.search_vector @@ q.tsq
+            UNION ALL
+            SELECT o.id, GREATEST(similarity(u.name, q.raw), similarity(u.email, q.raw))::float8, NULL
+            FROM {queries.SCHEMA}.users u
+            JOIN {queries.SCHEMA}.orders o ON o.user_id = u.id, q
+            WHERE u.name %% q.raw OR u.email %% q.raw
+        ),
+        ranked AS (
+            SELECT order_id, MAX(rank) AS rank,
+                   (ARRAY_AGG(message_id ORDER BY rank DESC) FILTER (WHERE message_id IS NOT NULL))[1] AS message_id
+            FROM hits
+            GROUP BY order_id
+        )
+        SELECT page.id, page.user_id, page.service_type, page.status, page.price, page.created_at,
+               page.client_name, page.client_email, page.rank, page.message_id,
+               ts_headline('russian', page.snippet_source, q.tsq,
+                           'MaxWords=25, MinWords=8, StartSel=<<, StopSel=>>') AS snippet
+        FROM (
+            SELECT o.id, o.user_id, o.service_type, o.status, o.price, o.created_at,
+                   u.name AS client_name, u.email AS client_email, r.rank, r.message_id,
+                   COALESCE(m.message, o.description, o.service_type) AS snippet_source
+            FROM ranked r
+            JOIN {queries.SCHEMA}.orders o ON o.id = r.order_id
+            JOIN {queries.SCHEMA}.users u ON o.user_id = u.id
+            LEFT JOIN {queries.SCHEMA}.order_messages m ON m.id = r.message_id
+            WHERE 1=1
+    """
+    params: List[Any] = [page['text'], page['text']]
+    
+    if owner_id is not None:
+        query += " AND o.user_id = %s"
+        params.append(owner_id)
+    
+    if page['status']:
+        query += " AND o.status = %s"
+        params.append(page['status'])
+    
+    if page['date_from']:
+        query += " AND o.created_at >= %s"
+        params.append(page['date_from'])
     
-    database_url = os.environ.get('DATABASE_URL')
-    conn = psycopg2.connect(database_url)
-    cur = conn.cursor(cursor_factory=RealDictCursor)
+    if page['date_to']:
+        query += " AND o.created_at < %s"
+        params.append(page['date_to'])
     
+    if page['after']:
+        query += " AND (r.rank, o.id) < (%s, %s)"
+        params.extend(page['after'])
+    
+    query += """
+            ORDER BY r.rank DESC, o.id DESC
+            LIMIT %s
+        ) page, q
+        ORDER BY page.rank DESC, page.id DESC
+    """
+    params.append(page['limit'] + 1)
+    return query, params
+
+def search_orders(conn: Any, params: Dict[str, Any], owner_id: Optional[int], shape: str) -> Dict[str, Any]:
     try:
-        if method == 'GET':
-            cur.execute(f"SELECT role FROM t_p57800500_anime_tattoo_website.users WHERE id = {user_id}")
-            user = cur.fetchone()
-            
-            if not user:
-                return {
-                    'statusCode': 404,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Пользователь не найден'})
-                }
-            
-            params = event.get('queryStringParameters', {})
-            order_id = params.get('id')
-            
-            if order_id:
-                cur.execute(f"""
-                    SELECT o.*, u.name as client_name, u.email as client_email 
-                    FROM t_p57800500_anime_tattoo_website.orders o
-                    JOIN t_p57800500_anime_tattoo_website.users u ON o.user_id = u.id
-                    WHERE o.id = {order_id}
-                """)
-                order = cur.fetchone()
-                
-                if not order:
-                    return {
-                        'statusCode': 404,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'error': 'Заказ не найден'})
-                    }
-                
-                if user['role'] != 'master' and order['user_id'] != int(user_id):
-                    return {
-                        'statusCode': 403,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'error': 'Доступ запрещен'})
-                    }
-                
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps(dict(order), default=str)
-                }
-            else:
-                if user['role'] == 'master':
-                    cur.execute("""
-                        SELECT o.*, u.name as client_name, u.email as client_email 
-                        FROM t_p57800500_anime_tattoo_website.orders o
-                        JOIN t_p57800500_anime_tattoo_website.users u ON o.user_id = u.id
-                        ORDER BY o.created_at DESC
-                    """)
-                else:
-                    cur.execute(f"""
-                        SELECT o.*, u.name as client_name, u.email as client_email 
-                        FROM t_p57800500_anime_tattoo_website.orders o
-                        JOIN t_p57800500_anime_tattoo_website.users u ON o.user_id = u.id
-                        WHERE o.user_id = {user_id}
-                        ORDER BY o.created_at DESC
-                    """)
-                
-                orders = cur.fetchall()
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps([dict(o) for o in orders], default=str)
-                }
+        page = parse_search_params(params)
+    except (ValueError, TypeError, KeyError):
+        return error(400, f'Поисковый запрос должен содержать не менее {MIN_SEARCH_LENGTH} символов')
+    
+    query, query_params = build_search_query(page, owner_id)
+    with conn.cursor() as cur:
+        cur.execute(query, query_params)
+        columns, rows = fetch_rowset(cur)
+    
+    extra_headers = None
+    if len(rows) > page['limit']:
+        rows = rows[:page['limit']]
+        last = rows[-1]
+        extra_headers = {'X-Next-Cursor': encode_search_cursor(last[columns.index('rank')], last[columns.index('id')])}
+    
+    return json_response(200, shape_rows(columns, rows, shape), extra_headers)
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    return router.dispatch(event, context)
+
+@router.route('GET')
+@require_identity
+def get_orders(event: Dict[str, Any], identity: Dict[str, Any]) -> Dict[str, Any]:
+    user_id = identity['id']
+    params = event.get('queryStringParameters') or {}
+    order_id = params.get('id')
+    shape = parse_shape(params)
+    
+    if order_id and params.get('messages'):
+        return get_order_with_thread(identity, params)
+    
+    if order_id:
+        order_id = parse_int(order_id, 'id')
+    
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        user = resolve_principal(cur, identity)
         
-        elif method == 'POST':
-            body_data = json.loads(event.get('body', '{}'))
-            service_type = body_data.get('service_type', '').replace("'", "''")
-            description = body_data.get('description', '').replace("'", "''")
-            
-            if not service_type:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Не указан тип услуги'})
-                }
-            
-            cur.execute(f"""
-                INSERT INTO t_p57800500_anime_tattoo_website.orders 
-                (user_id, service_type, description, status)
-                VALUES ({user_id}, '{service_type}', '{description}', 'pending')
-                RETURNING id, user_id, service_type, description, status, price, payment_method, created_at, updated_at
-            """)
-            order = cur.fetchone()
-            conn.commit()
-            
-            return {
-                'statusCode': 201,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps(dict(order), default=str)
-            }
+        if not user:
+            return error(404, 'Пользователь не найден')
         
-        elif method == 'PUT':
-            body_data = json.loads(event.get('body', '{}'))
-            order_id = body_data.get('order_id')
-            
-            if not order_id:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Не указан ID заказа'})
-                }
-            
-            cur.execute(f"SELECT role FROM t_p57800500_anime_tattoo_website.users WHERE id = {user_id}")
-            user = cur.fetchone()
-            
-            cur.execute(f"SELECT * FROM t_p57800500_anime_tattoo_website.orders WHERE id = {order_id}")
+        if params.get('summary'):
+            if user['role'] != 'master':
+                return error(403, 'Доступ запрещен')
+            queries.execute(cur, 'dashboard_summary', (user_id,))
+            return json_response(200, build_summary(cur.fetchall()))
+        
+        if params.get('q') is not None:
+            return search_orders(conn, params, None if user['role'] == 'master' else user_id, shape)
+        
+        if order_id:
+            queries.execute(cur, 'order_with_client', (order_id,))
             order = cur.fetchone()
             
             if not order:
-                return {
-                    'statusCode': 404,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Заказ не найден'})
-                }
-            
-            if user['role'] != 'master' and order['user_id'] != int(user_id):
-                return {
-                    'statusCode': 403,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Доступ запрещен'})
-                }
+                return error(404, 'Заказ не найден')
             
-            updates = []
+            if user['role'] != 'master' and order['user_id'] != user_id:
+                return error(403, 'Доступ запрещен')
             
-            if 'status' in body_data:
-                status = body_data['status'].replace("'", "''")
-                updates.append(f"status = '{status}'")
-            
-            if 'price' in body_data and user['role'] == 'master':
-                price = body_data['price']
-                updates.append(f"price = {price}")
-                if 'status' not in body_data:
-                    updates.append("status = 'priced'")
-            
-            if 'payment_method' in body_data:
-                payment_method = body_data['payment_method'].replace("'", "''")
-                updates.append(f"payment_method = '{payment_method}'")
-            
-            if updates:
-                updates.append("updated_at = CURRENT_TIMESTAMP")
-                update_str = ', '.join(updates)
-                
-                cur.execute(f"""
-                    UPDATE t_p57800500_anime_tattoo_website.orders 
-                    SET {update_str}
-                    WHERE id = {order_id}
-                    RETURNING id, user_id, service_type, description, status, price, payment_method, created_at, updated_at
-                """)
-                updated_order = cur.fetchone()
-                conn.commit()
-                
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps(dict(updated_order), default=str)
-                }
-            
-            return {
-                'statusCode': 400,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Нет данных для обновления'})
-            }
+            return json_response(200, order)
+        
+        try:
+            page = parse_page_params(params)
+        except (ValueError, TypeError, KeyError):
+            return error(400, 'Неверные параметры списка заказов')
         
-        return {
-            'statusCode': 405,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Метод не поддерживается'})
+        owner_id = None if user['role'] == 'master' else user_id
+        query, query_params = build_list_query(page, owner_id)
+        
+        with conn.cursor() as rows_cur:
+            rows_cur.execute(query, query_params)
+            columns, rows = fetch_rowset(rows_cur)
+    
+    extra_headers = None
+    if page['limit'] is not None and len(rows) > page['limit']:
+        rows = rows[:page['limit']]
+        last = rows[-1]
+        extra_headers = {
+            'X-Next-Cursor': encode_cursor(last[columns.index('created_at')], last[columns.index('id')])
         }
     
-    finally:
-        cur.close()
-        conn.close()
+    return json_response(200, shape_rows(columns, rows, shape), extra_headers)
+
+def get_order_with_thread(identity: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        order_id = int(params['id'])
+        limit = min(max(int(params['messages']), 1), MAX_THREAD_MESSAGES)
+    except ValueError:
+        return error(400, 'Неверный параметр id или messages')
+    
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        queries.execute(cur, 'order_with_thread', (order_id, identity['id'], limit + 1))
+        order = cur.fetchone()
+    
+    if not order:
+        return error(404, 'Заказ не найден')
+    
+    if not order.pop('is_master') and order['user_id'] != identity['id']:
+        return error(403, 'Доступ запрещен')
+    
+    messages = order['messages']
+    has_more = order.pop('messages_fetched') > limit
+    if has_more:
+        messages = messages[1:]
+    order['messages'] = messages
+    order['messages_has_more'] = has_more
+    order['messages_before_id'] = messages[0]['id'] if has_more else None
+    return json_response(200, order)
+
+@router.route('POST')
+@require_identity
+@idempotent('orders', by_principal)
+def create_order(event: Dict[str, Any], identity: Dict[str, Any], conn: Any) -> Dict[str, Any]:
+    body_data = parse_body(event)
+    service_type = body_data.get('service_type', '')
+    description = body_data.get('description', '')
+    
+    if not service_type:
+        return error(400, 'Не указан тип услуги')
+    
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        queries.execute(cur, 'order_insert', (identity['id'], service_type, description))
+        order = cur.fetchone()
+    
+    return json_response(201, order)
+
+@router.route('PUT')
+@require_identity
+def update_order(event: Dict[str, Any], identity: Dict[str, Any]) -> Dict[str, Any]:
+    body_data = parse_body(event)
+    
+    if not body_data.get('order_id'):
+        return error(400, 'Не указан ID заказа')
+    
+    order_id = parse_int(body_data['order_id'], 'order_id')
+    version = parse_int(body_data['version'], 'version') if body_data.get('version') is not None else None
+    
+    try:
+        price = Decimal(str(body_data['price'])) if body_data.get('price') is not None else None
+        if price is not None and not price.is_finite():
+            raise ValueError(price)
+    except (ValueError, TypeError, ArithmeticError):
+        return error(400, 'Неверный параметр price')
+    
+    status = body_data.get('status')
+    payment_method = body_data.get('payment_method')
+    
+    if identity.get('role') not in (None, 'master'):
+        price = None
+    
+    if status is None and price is None and payment_method is None:
+        return error(400, 'Нет данных для обновления')
+    
+    if status is not None and status not in STATUSES:
+        return error(400, f'Неизвестный статус: {status}')
+    
+    with connection(autocommit=True) as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        queries.execute(cur, 'order_update', (
+            order_id, status, price, payment_method, identity['id'], version
+        ))
+        updated_order = cur.fetchone()
+        
+        if updated_order:
+            return json_response(200, updated_order)
+        
+        queries.execute(cur, 'order_update_check', (order_id, identity['id']))
+        order = cur.fetchone()
+    
+    if not order:
+        return error(404, 'Заказ не найден')
+    
+    if not order['is_master'] and order['user_id'] != identity['id']:
+        return error(403, 'Доступ запрещен')
+    
+    if version is not None and order['version'] != version:
+        return json_response(409, {
+            'error': 'Заказ уже изменен, обновите данные',
+            'version': order['version'],
+            'status': order['status']
+        })
+    
+    target = status or 'priced'
+    return json_response(409, {
+        'error': f"Недопустимый переход статуса: {order['status']} → {target}",
+        'status': order['status'],
+        'allowed': allowed_targets(order['status'], order['is_master'])
+    })
@@ -0,0 +1,3 @@
+'''
+Business: Shared code for backend functions (connection pool and helpers)
+'''
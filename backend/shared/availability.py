@@ -0,0 +1,141 @@
+'''
+Business: Bookings availability - slot length per service, per-day interval index and conflict detection
+Args: service duration text, confirmed/pending booking intervals, BOOKING_OPEN_HOUR/BOOKING_CLOSE_HOUR/AVAILABILITY_CACHE_TTL env
+Returns: overlap answers and free slots between two moments in O(log n) per day
+'''
+
+import os
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from shared.cache import TTLCache
+
+DEFAULT_SLOT_MINUTES = 240
+ACTIVE_STATUSES = ('pending', 'confirmed')
+LOCK_NAMESPACE = 7310
+
+Interval = Tuple[datetime, datetime]
+
+
+def slot_minutes(duration: Optional[str]) -> int:
+    if not duration:
+        return DEFAULT_SLOT_MINUTES
+    # "1,5 часа" uses a decimal comma, so it is one number rather than the range 1-5
+    numbers = [float(n.replace(',', '.')) for n in re.findall(r'\d+(?:[.,]\d+)?', duration)]
+    if not numbers:
+        return DEFAULT_SLOT_MINUTES
+    if 'мин' in duration.lower():
+        return round(max(numbers))
+    return round(max(numbers) * 60)
+
+
+def days_between(start: datetime, end: datetime) -> List[date]:
+    last = (end - timedelta(microseconds=1)).date()
+    days = []
+    current = start.date()
+    while current <= last:
+        days.append(current)
+        current += timedelta(days=1)
+    return days
+
+
+def lock_keys(start: datetime, end: datetime) -> List[Tuple[int, int]]:
+    return [(LOCK_NAMESPACE, day.toordinal()) for day in days_between(start, end)]
+
+
+class DayIndex:
+    def __init__(self, intervals: Iterable[Interval] = ()):
+        self._starts: List[datetime] = []
+        self._ends: List[datetime] = []
+        for start, end in sorted(intervals):
+            self._append(start, end)
+
+    def _append(self, start: datetime, end: datetime) -> None:
+        if self._ends and start <= self._ends[-1]:
+            self._ends[-1] = max(self._ends[-1], end)
+        else:
+            self._starts.append(start)
+            self._ends.append(end)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        i = bisect_right(self._ends, start)
+        return i < len(self._starts) and self._starts[i] < end
+
+    def add(self, start: datetime, end: datetime) -> None:
+        lo = bisect_left(self._ends, start)
+        hi = bisect_right(self._starts, end)
+        if lo < hi:
+            start = min(start, self._starts[lo])
+            end = max(end, self._ends[hi - 1])
+            del self._starts[lo:hi]
+            del self._ends[lo:hi]
+        position = bisect_left(self._starts, start)
+        self._starts.insert(position, start)
+        self._ends.insert(position, end)
+
+    def free_slots(self, start: datetime, end: datetime, min_length: timedelta) -> Iterator[Interval]:
+        i = bisect_right(self._ends, start)
+        cursor = start
+        while i < len(self._starts) and self._starts[i] < end:
+            if self._starts[i] - cursor >= min_length:
+                yield cursor, self._starts[i]
+            cursor = max(cursor, self._ends[i])
+            i += 1
+        if end - cursor >= min_length:
+            yield cursor, end
+
+
+class AvailabilityIndex:
+    def __init__(self, loader: Callable[[Any, datetime, datetime], Iterable[Interval]], ttl: float = 30.0,
+                 max_days: int = 366, open_hour: int = 10, close_hour: int = 21):
+        self._loader = loader
+        self._days = TTLCache(max_size=max_days, ttl=ttl)
+        self.open_hour = open_hour
+        self.close_hour = close_hour
+
+    def day(self, cur: Any, day: date) -> DayIndex:
+        index = self._days.get(day)
+        if index is None:
+            day_start = datetime.combine(day, time.min)
+            index = DayIndex(self._loader(cur, day_start, day_start + timedelta(days=1)))
+            self._days.set(day, index)
+        return index
+
+    def invalidate(self, start: datetime, end: datetime) -> None:
+        for day in days_between(start, end):
+            self._days.invalidate(day)
+
+    def record(self, start: datetime, end: datetime) -> None:
+        for day in days_between(start, end):
+            index = self._days.get(day)
+            if index is not None:
+                index.add(start, end)
+
+    def overlaps(self, cur: Any, start: datetime, end: datetime) -> bool:
+        return any(self.day(cur, day).overlaps(start, end) for day in days_between(start, end))
+
+    def free_slots(self, cur: Any, start: datetime, end: datetime, length: timedelta) -> List[Interval]:
+        slots: List[Interval] = []
+        for day in days_between(start, end):
+            opens = max(start, datetime.combine(day, time(self.open_hour)))
+            closes = min(end, datetime.combine(day, time(self.close_hour)))
+            if closes - opens < length:
+                continue
+            slots.extend(self.day(cur, day).free_slots(opens, closes, length))
+        return slots
+
+    def stats(self) -> Dict[str, Any]:
+        return self._days.stats()
+
+
+def build_index(loader: Callable[[Any, datetime, datetime], Iterable[Interval]]) -> AvailabilityIndex:
+    return AvailabilityIndex(
+        loader,
+        ttl=float(os.environ.get('AVAILABILITY_CACHE_TTL', '30')),
+        open_hour=int(os.environ.get('BOOKING_OPEN_HOUR', '10')),
+        close_hour=int(os.environ.get('BOOKING_CLOSE_HOUR', '21')),
+    )
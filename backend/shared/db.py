@@ -0,0 +1,211 @@
+'''
+Business: Module-level PostgreSQL connection pool reused across warm invocations
+Args: DATABASE_URL, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT, DB_POOL_PING_AFTER env variables
+Returns: pooled psycopg2 connections with health checks and hit/miss/wait stats
+'''
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+from shared import instrument
+
+
+class PoolTimeout(PoolError):
+    pass
+
+
+class PooledConnection(extensions.connection):
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.prepared: Set[str] = set()
+        self.after_commit: List[Callable[[], None]] = []
+
+    def commit(self) -> None:
+        super().commit()
+        callbacks, self.after_commit = self.after_commit, []
+        for callback in callbacks:
+            callback()
+
+    def rollback(self) -> None:
+        self.after_commit = []
+        super().rollback()
+
+    def cursor(self, *args: Any, **kwargs: Any) -> Any:
+        base = kwargs.get('cursor_factory') or self.cursor_factory or extensions.cursor
+        kwargs['cursor_factory'] = instrument.instrumented(base)
+        return super().cursor(*args, **kwargs)
+
+
+class ConnectionPool:
+    def __init__(self, dsn: str, max_size: int = 5, timeout: float = 5.0, ping_after: float = 30.0):
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+        self.dsn = dsn
+        self.max_size = max_size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._idle: List[Tuple[Any, float]] = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats: Dict[str, float] = {
+            'hits': 0,
+            'misses': 0,
+            'waits': 0,
+            'wait_time_ms': 0.0,
+            'discarded': 0,
+            'timeouts': 0,
+        }
+
+    def _connect(self) -> Any:
+        return psycopg2.connect(self.dsn, connection_factory=PooledConnection)
+
+    def _is_healthy(self, conn: Any, released_at: float) -> bool:
+        if conn.closed:
+            return False
+        if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - released_at < self.ping_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn: Any) -> None:
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats['discarded'] += 1
+            self._cond.notify()
+
+    def _record(self, key: str, started: float, waited: bool) -> None:
+        with self._cond:
+            self._stats[key] += 1
+            if waited:
+                self._stats['waits'] += 1
+                self._stats['wait_time_ms'] += (time.monotonic() - started) * 1000
+
+    def getconn(self) -> Any:
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        while True:
+            conn = None
+            released_at = 0.0
+            with self._cond:
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(f'No free connection within {self.timeout}s')
+                    waited = True
+                    self._cond.wait(remaining)
+                    continue
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                self._record('misses', started, waited)
+                return conn
+
+            if self._is_healthy(conn, released_at):
+                self._record('hits', started, waited)
+                return conn
+            self._discard(conn)
+
+    def putconn(self, conn: Any, close: bool = False) -> None:
+        if close or conn.closed:
+            self._discard(conn)
+            return
+        if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                self._discard(conn)
+                return
+        conn.after_commit = []
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, autocommit: bool = False) -> Iterator[Any]:
+        with instrument.phase('connect'):
+            conn = self.getconn()
+        broken = False
+        try:
+            if autocommit:
+                conn.autocommit = True
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if autocommit and not conn.closed:
+                conn.autocommit = False
+            self.putconn(conn, close=broken)
+
+    def closeall(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self._stats,
+                'size': self._size,
+                'idle': len(self._idle),
+                'max_size': self.max_size,
+            }
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    os.environ['DATABASE_URL'],
+                    max_size=int(os.environ.get('DB_POOL_MAX_SIZE', '5')),
+                    timeout=float(os.environ.get('DB_POOL_TIMEOUT', '5')),
+                    ping_after=float(os.environ.get('DB_POOL_PING_AFTER', '30')),
+                )
+    return _pool
+
+
+def connection(autocommit: bool = False) -> Any:
+    return get_pool().connection(autocommit)
+
+
+def pool_stats() -> Dict[str, Any]:
+    return get_pool().stats()
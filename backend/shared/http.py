@@ -0,0 +1,162 @@
+'''
+Business: Shared response and routing layer for backend functions
+Args: route handlers registered per HTTP method, response data and optional extra headers
+Returns: cloud function responses with precomputed headers, a fast JSON encoder (orjson when installed)
+         and per-invocation instrumentation (see shared.instrument)
+'''
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional
+from shared import instrument
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_HEADERS: Mapping[str, str] = MappingProxyType({
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+})
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+_stdlib_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=_default)
+
+
+def encode_stdlib(data: Any) -> str:
+    return _stdlib_encoder.encode(data)
+
+
+if orjson is not None:
+    def encode(data: Any) -> str:
+        return orjson.dumps(data, default=_default).decode()
+else:
+    encode = encode_stdlib
+
+
+def get_header(headers: Optional[Mapping[str, Any]], name: str) -> Optional[str]:
+    if not headers:
+        return None
+    return headers.get(name) or headers.get(name.lower())
+
+
+def parse_body(event: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        data = json.loads(event.get('body') or '{}')
+    except ValueError:
+        raise HttpError(400, 'Неверный формат JSON')
+    if not isinstance(data, dict):
+        raise HttpError(400, 'Неверный формат JSON')
+    return data
+
+
+def parse_int(value: Any, name: str) -> int:
+    if isinstance(value, bool):
+        raise HttpError(400, f'Неверный параметр {name}')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HttpError(400, f'Неверный параметр {name}')
+
+
+def json_response(status: int, data: Any, extra_headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    if extra_headers:
+        headers = {**JSON_HEADERS, **extra_headers, 'Access-Control-Expose-Headers': ', '.join(extra_headers)}
+    else:
+        headers = dict(JSON_HEADERS)
+    with instrument.phase('serialize'):
+        body = encode(data)
+    return {
+        'statusCode': status,
+        'headers': headers,
+        'body': body,
+        'isBase64Encoded': False
+    }
+
+
+def raw_response(status: int, body: str, content_type: str, extra_headers: Optional[Dict[str, str]] = None,
+                 is_base64: bool = False) -> Dict[str, Any]:
+    headers = {'Content-Type': content_type, 'Access-Control-Allow-Origin': '*'}
+    if extra_headers:
+        headers.update(extra_headers)
+        headers['Access-Control-Expose-Headers'] = ', '.join(extra_headers)
+    return {
+        'statusCode': status,
+        'headers': headers,
+        'body': body,
+        'isBase64Encoded': is_base64
+    }
+
+
+def error(status: int, message: str, extra_headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    return json_response(status, {'error': message}, extra_headers)
+
+
+class Router:
+    def __init__(self, name: str, allow_headers: str = 'Content-Type', max_age: int = 86400):
+        self.name = name
+        self.allow_headers = allow_headers
+        self.max_age = max_age
+        self._routes: Dict[str, Callable[..., Dict[str, Any]]] = {}
+        self._preflight: Optional[Mapping[str, str]] = None
+
+    def route(self, method: str) -> Callable:
+        def register(fn: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+            self._routes[method.upper()] = fn
+            self._preflight = None
+            return fn
+        return register
+
+    def preflight(self) -> Dict[str, Any]:
+        if self._preflight is None:
+            self._preflight = MappingProxyType({
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': ', '.join([*self._routes, 'OPTIONS']),
+                'Access-Control-Allow-Headers': self.allow_headers,
+                'Access-Control-Max-Age': str(self.max_age),
+            })
+        return {
+            'statusCode': 200,
+            'headers': dict(self._preflight),
+            'body': '',
+            'isBase64Encoded': False
+        }
+
+    def dispatch(self, event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        method = event.get('httpMethod', 'GET')
+        if method == 'OPTIONS':
+            return self.preflight()
+
+        route = self._routes.get(method)
+        if route is None:
+            return error(405, 'Метод не поддерживается')
+
+        trace = instrument.start(self.name, method)
+        return instrument.finish(trace, self._call(route, event, context), context)
+
+    def _call(self, route: Callable[..., Dict[str, Any]], event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        try:
+            return route(event, context)
+        except HttpError as e:
+            return error(e.status, e.message, e.headers)
+        except Exception as e:
+            return error(500, f'Ошибка сервера: {str(e)}')
@@ -0,0 +1,127 @@
+'''
+Business: Idempotency-Key support for create endpoints - the first successful response is stored and replayed on retries
+Args: scope (function name), owner (by_principal or by_client_ip) that keys are scoped to, IDEMPOTENCY_TTL seconds
+      (default 86400), IDEMPOTENCY_CACHE_SIZE env; Idempotency-Key header;
+      the wrapped route gets the transaction's connection as a third argument and must not commit it
+Returns: the wrapped route's response, or the stored one with Idempotent-Replayed: true for a repeated key
+'''
+
+import functools
+import hashlib
+import json
+import os
+import random
+from typing import Any, Callable, Dict, Optional, Tuple
+from shared.cache import TTLCache
+from shared.db import connection
+from shared.http import HttpError, get_header
+from shared.queries import SCHEMA
+from shared.ratelimit import client_ip
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+LOCK_NAMESPACE = 7311
+CLEANUP_PROBABILITY = 0.01
+
+
+def ttl() -> int:
+    return int(os.environ.get('IDEMPOTENCY_TTL', '86400'))
+
+
+responses = TTLCache(max_size=int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '1024')), ttl=ttl())
+
+
+def request_fingerprint(event: Dict[str, Any]) -> str:
+    digest = hashlib.sha256()
+    for part in (event.get('httpMethod'), event.get('path'), event.get('body')):
+        digest.update((part or '').encode())
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def replay(fingerprint: str, stored: Tuple[str, Dict[str, Any]]) -> Dict[str, Any]:
+    stored_fingerprint, response = stored
+    if stored_fingerprint != fingerprint:
+        raise HttpError(422, 'Ключ идемпотентности уже использован для другого запроса')
+    headers = {**response['headers'], 'Idempotent-Replayed': 'true'}
+    exposed = headers.get('Access-Control-Expose-Headers')
+    headers['Access-Control-Expose-Headers'] = f'{exposed}, Idempotent-Replayed' if exposed else 'Idempotent-Replayed'
+    return {**response, 'headers': headers}
+
+
+def request_key(event: Dict[str, Any]) -> Optional[str]:
+    key = get_header(event.get('headers'), HEADER)
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HttpError(400, f'{HEADER} должен содержать от 1 до {MAX_KEY_LENGTH} символов')
+    return key
+
+
+def complete(conn: Any, response: Dict[str, Any]) -> Dict[str, Any]:
+    if 200 <= response['statusCode'] < 300:
+        conn.commit()
+    else:
+        conn.rollback()
+    return response
+
+
+def by_principal(event: Dict[str, Any], identity: Dict[str, Any]) -> str:
+    return f"user:{identity['id']}"
+
+
+def by_client_ip(event: Dict[str, Any], arg: Any) -> str:
+    return f'ip:{client_ip(event)}'
+
+
+def idempotent(scope: str, owner: Callable[[Dict[str, Any], Any], str]) -> Callable:
+    def decorate(fn: Callable[[Dict[str, Any], Any, Any], Dict[str, Any]]) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(event: Dict[str, Any], arg: Any) -> Dict[str, Any]:
+            key = request_key(event)
+            if key is None:
+                with connection() as conn:
+                    return complete(conn, fn(event, arg, conn))
+
+            storage_key = f'{scope}:{owner(event, arg)}:{key}'
+            fingerprint = request_fingerprint(event)
+            stored = responses.get(storage_key)
+            if stored is not None:
+                return replay(fingerprint, stored)
+
+            # The route writes on this connection and the key row is stored in the same transaction,
+            # so both commit together. The transaction-scoped lock serializes concurrent requests
+            # with the same key: the first runs the route while the rest wait and then find its stored response.
+            with connection() as conn, conn.cursor() as cur:
+                cur.execute('SELECT pg_advisory_xact_lock(%s, hashtext(%s))', (LOCK_NAMESPACE, storage_key))
+                cur.execute(
+                    f"""SELECT fingerprint, response FROM {SCHEMA}.idempotency_keys
+                        WHERE key = %s AND expires_at > now()""",
+                    (storage_key,)
+                )
+                row = cur.fetchone()
+                if row:
+                    conn.rollback()
+                    stored = (row[0], row[1])
+                    responses.set(storage_key, stored)
+                    return replay(fingerprint, stored)
+
+                response = fn(event, arg, conn)
+                if 200 <= response['statusCode'] < 300:
+                    cur.execute(
+                        f"""INSERT INTO {SCHEMA}.idempotency_keys (key, fingerprint, response, expires_at)
+                            VALUES (%s, %s, %s::jsonb, now() + %s * interval '1 second')
+                            ON CONFLICT (key) DO UPDATE
+                            SET fingerprint = EXCLUDED.fingerprint, response = EXCLUDED.response,
+                                created_at = now(), expires_at = EXCLUDED.expires_at""",
+                        (storage_key, fingerprint, json.dumps(response, ensure_ascii=False), ttl())
+                    )
+                    if random.random() < CLEANUP_PROBABILITY:
+                        cur.execute(f'DELETE FROM {SCHEMA}.idempotency_keys WHERE expires_at < now()')
+                complete(conn, response)
+            if 200 <= response['statusCode'] < 300:
+                responses.set(storage_key, (fingerprint, {**response, 'headers': dict(response['headers'])}))
+            return response
+        return wrapper
+    return decorate
@@ -0,0 +1,161 @@
+'''
+Business: Per-invocation instrumentation - connect/query/serialize timing, round-trip counts, Server-Timing and a JSON log line
+Args: INSTRUMENT_SAMPLE_RATE env (0..1, default 1; share of invocations traced), function name and HTTP method
+Returns: traced responses with a Server-Timing header plus one structured log line per sampled invocation,
+         or the same records collected in a list inside observe() (harness, benchmarks)
+'''
+
+import json
+import os
+import random
+import re
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+PHASES = ('connect', 'db', 'serialize')
+SLOWEST_STATEMENTS = 3
+
+_current: ContextVar[Optional['Trace']] = ContextVar('instrument_trace', default=None)
+_observer: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar('instrument_observer', default=None)
+_factories: Dict[Any, Any] = {}
+_whitespace = re.compile(r'\s+')
+
+
+def sample_rate() -> float:
+    return float(os.environ.get('INSTRUMENT_SAMPLE_RATE', '1'))
+
+
+def statement_label(query: Any) -> str:
+    if isinstance(query, bytes):
+        query = query.decode(errors='replace')
+    text = _whitespace.sub(' ', str(query)).strip()
+    if text.startswith('EXECUTE '):
+        return text.split(' (', 1)[0]
+    return text[:80]
+
+
+class Trace:
+    def __init__(self, function: str, method: str):
+        self.function = function
+        self.method = method
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.statements: List[Tuple[float, str]] = []
+        self.token: Any = None
+
+    def add(self, phase: str, ms: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + ms
+
+    def query(self, statement: Any, ms: float) -> None:
+        self.queries += 1
+        self.phases['db'] += ms
+        self.statements.append((ms, statement_label(statement)))
+
+    def server_timing(self, total_ms: float) -> str:
+        parts = [f'{name};dur={ms:.1f}' for name, ms in self.phases.items() if ms]
+        parts.append(f'queries;desc="{self.queries} round-trips"')
+        parts.append(f'total;dur={total_ms:.1f}')
+        return ', '.join(parts)
+
+    def record(self, status: int, total_ms: float, context: Any) -> Dict[str, Any]:
+        slowest = sorted(self.statements, reverse=True)[:SLOWEST_STATEMENTS]
+        return {
+            'event': 'request',
+            'function': self.function,
+            'method': self.method,
+            'status': status,
+            'request_id': getattr(context, 'request_id', None),
+            'total_ms': round(total_ms, 2),
+            **{f'{name}_ms': round(ms, 2) for name, ms in self.phases.items()},
+            'queries': self.queries,
+            'slowest': [{'ms': round(ms, 2), 'statement': label} for ms, label in slowest],
+        }
+
+
+class phase:
+    __slots__ = ('name', 'trace', 'started')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> 'phase':
+        self.trace = _current.get()
+        if self.trace is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self.trace is not None:
+            self.trace.add(self.name, (time.perf_counter() - self.started) * 1000)
+
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def observe() -> Iterator[List[Dict[str, Any]]]:
+    records: List[Dict[str, Any]] = []
+    token = _observer.set(records)
+    try:
+        yield records
+    finally:
+        _observer.reset(token)
+
+
+def start(function: str, method: str) -> Optional[Trace]:
+    rate = sample_rate()
+    if _observer.get() is None and (rate <= 0 or (rate < 1 and random.random() >= rate)):
+        return None
+    trace = Trace(function, method)
+    trace.token = _current.set(trace)
+    return trace
+
+
+def finish(trace: Optional[Trace], response: Dict[str, Any], context: Any = None) -> Dict[str, Any]:
+    if trace is None:
+        return response
+    _current.reset(trace.token)
+    total_ms = (time.perf_counter() - trace.started) * 1000
+
+    headers = response.setdefault('headers', {})
+    headers['Server-Timing'] = trace.server_timing(total_ms)
+    exposed = headers.get('Access-Control-Expose-Headers')
+    headers['Access-Control-Expose-Headers'] = f'{exposed}, Server-Timing' if exposed else 'Server-Timing'
+
+    record = trace.record(response.get('statusCode', 0), total_ms, context)
+    observed = _observer.get()
+    if observed is not None:
+        observed.append(record)
+    else:
+        print(json.dumps(record, ensure_ascii=False, separators=(',', ':')), file=sys.stdout, flush=True)
+    return response
+
+
+def _timed(method: Any) -> Any:
+    def wrapper(self: Any, query: Any, *args: Any, **kwargs: Any) -> Any:
+        trace = _current.get()
+        if trace is None:
+            return method(self, query, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return method(self, query, *args, **kwargs)
+        finally:
+            trace.query(query, (time.perf_counter() - started) * 1000)
+    return wrapper
+
+
+def instrumented(base: Any) -> Any:
+    factory = _factories.get(base)
+    if factory is None:
+        factory = type(f'Instrumented{base.__name__}', (base,), {
+            'execute': _timed(base.execute),
+            'executemany': _timed(base.executemany),
+            'copy_expert': _timed(base.copy_expert),
+        })
+        _factories[base] = factory
+    return factory
@@ -0,0 +1,121 @@
+'''
+Business: One process-wide LISTEN connection, kept outside the pool, that wakes long-poll waiters on NOTIFY
+Args: DATABASE_URL env; channel names to wait on
+Returns: threading.Event per waiter, set when a notification arrives on its channel or the connection drops
+'''
+
+import os
+import select
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Set
+import psycopg2
+from psycopg2 import extensions
+
+POLL_SECONDS = 1.0
+
+
+class Listener:
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._lock = threading.Lock()
+        self._conn: Optional[Any] = None
+        self._waiters: Dict[str, Set[threading.Event]] = {}
+
+    def _connect(self) -> None:
+        conn = psycopg2.connect(self.dsn)
+        conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            for channel in self._waiters:
+                cur.execute(f'LISTEN {channel}')
+        self._conn = conn
+        threading.Thread(target=self._run, args=(conn,), name='notify-listener', daemon=True).start()
+
+    def _drop(self, conn: Any) -> None:
+        # Waiters are woken so they re-check through the pool instead of sleeping until their timeout
+        if self._conn is conn:
+            self._conn = None
+            for waiters in self._waiters.values():
+                for event in waiters:
+                    event.set()
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _run(self, conn: Any) -> None:
+        while True:
+            try:
+                readable, _, _ = select.select([conn], [], [], POLL_SECONDS)
+                with self._lock:
+                    if conn is not self._conn:
+                        return
+                    if readable:
+                        conn.poll()
+                    for notify in conn.notifies:
+                        for event in self._waiters.get(notify.channel, ()):
+                            event.set()
+                    conn.notifies.clear()
+            except (psycopg2.Error, OSError, ValueError):
+                with self._lock:
+                    self._drop(conn)
+                return
+
+    def subscribe(self, channel: str) -> threading.Event:
+        event = threading.Event()
+        with self._lock:
+            first = channel not in self._waiters
+            self._waiters.setdefault(channel, set()).add(event)
+            try:
+                if self._conn is None:
+                    self._connect()
+                elif first:
+                    with self._conn.cursor() as cur:
+                        cur.execute(f'LISTEN {channel}')
+            except psycopg2.Error:
+                self._release(channel, event)
+                if self._conn is not None:
+                    self._drop(self._conn)
+                raise
+        return event
+
+    def _release(self, channel: str, event: threading.Event) -> bool:
+        waiters = self._waiters.get(channel)
+        if waiters is None:
+            return False
+        waiters.discard(event)
+        if waiters:
+            return False
+        del self._waiters[channel]
+        return True
+
+    def unsubscribe(self, channel: str, event: threading.Event) -> None:
+        with self._lock:
+            if not self._release(channel, event) or self._conn is None:
+                return
+            try:
+                with self._conn.cursor() as cur:
+                    cur.execute(f'UNLISTEN {channel}')
+            except psycopg2.Error:
+                self._drop(self._conn)
+
+    @contextmanager
+    def listen(self, channel: str) -> Iterator[threading.Event]:
+        event = self.subscribe(channel)
+        try:
+            yield event
+        finally:
+            self.unsubscribe(channel, event)
+
+
+_listener: Optional[Listener] = None
+_listener_lock = threading.Lock()
+
+
+def get_listener() -> Listener:
+    global _listener
+    if _listener is None:
+        with _listener_lock:
+            if _listener is None:
+                _listener = Listener(os.environ['DATABASE_URL'])
+    return _listener
@@ -0,0 +1,35 @@
+'''
+Business: Declared order status state machine - which transitions exist and which need the master role
+Args: current and requested status
+Returns: transition table used by the authorized order UPDATE and for error messages
+'''
+
+from typing import Dict, Tuple
+
+STATUSES = ('pending', 'discussing', 'priced', 'paid', 'completed', 'cancelled')
+
+# (from, to) -> only the master may perform it
+TRANSITIONS: Dict[Tuple[str, str], bool] = {
+    ('pending', 'discussing'): False,
+    ('pending', 'priced'): True,
+    ('pending', 'cancelled'): False,
+    ('discussing', 'priced'): True,
+    ('discussing', 'cancelled'): False,
+    ('priced', 'discussing'): False,
+    ('priced', 'paid'): False,
+    ('priced', 'cancelled'): False,
+    ('paid', 'completed'): True,
+    ('paid', 'cancelled'): True,
+}
+
+
+def allowed_targets(status: str, is_master: bool) -> Tuple[str, ...]:
+    return tuple(to for (frm, to), master_only in TRANSITIONS.items()
+                 if frm == status and (is_master or not master_only))
+
+
+def transitions_sql() -> str:
+    return ', '.join(
+        f"('{frm}', '{to}', {'true' if master_only else 'false'})"
+        for (frm, to), master_only in TRANSITIONS.items()
+    )
@@ -0,0 +1,163 @@
+'''
+Business: Pluggable salted password hashing (scrypt, PBKDF2) with detection of legacy unsalted SHA-256 hashes
+Args: PASSWORD_HASHER (scrypt | pbkdf2_sha256), PASSWORD_SCRYPT_N/R/P, PASSWORD_PBKDF2_ITERATIONS env
+Returns: encoded hashes "<scheme>$<params>$<salt>$<hash>", verification results and rehash decisions
+'''
+
+import base64
+import hashlib
+import hmac
+import os
+import re
+import secrets
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+_LEGACY_SHA256 = re.compile(r'^[0-9a-f]{64}$')
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.b64encode(raw).decode().rstrip('=')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + '=' * (-len(data) % 4))
+
+
+class Hasher(ABC):
+    scheme = ''
+
+    @abstractmethod
+    def encode(self, password: str) -> str:
+        ...
+
+    @abstractmethod
+    def verify(self, password: str, encoded: str) -> bool:
+        ...
+
+    def is_current(self, encoded: str) -> bool:
+        return False
+
+
+class ScryptHasher(Hasher):
+    scheme = 'scrypt'
+
+    def __init__(self, n: int = 2 ** 14, r: int = 8, p: int = 1):
+        self.n = n
+        self.r = r
+        self.p = p
+
+    def _derive(self, password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=n, r=r, p=p,
+            maxmem=256 * n * r + 1024 * 1024, dklen=KEY_BYTES,
+        )
+
+    def encode(self, password: str) -> str:
+        salt = secrets.token_bytes(SALT_BYTES)
+        key = self._derive(password, salt, self.n, self.r, self.p)
+        return f'{self.scheme}${self.n}${self.r}${self.p}${_b64encode(salt)}${_b64encode(key)}'
+
+    def verify(self, password: str, encoded: str) -> bool:
+        _, n, r, p, salt, key = encoded.split('$')
+        derived = self._derive(password, _b64decode(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(derived, _b64decode(key))
+
+    def is_current(self, encoded: str) -> bool:
+        return encoded.split('$')[1:4] == [str(self.n), str(self.r), str(self.p)]
+
+
+class Pbkdf2Hasher(Hasher):
+    scheme = 'pbkdf2_sha256'
+
+    def __init__(self, iterations: int = 600000):
+        self.iterations = iterations
+
+    def encode(self, password: str) -> str:
+        salt = secrets.token_bytes(SALT_BYTES)
+        key = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, self.iterations, KEY_BYTES)
+        return f'{self.scheme}${self.iterations}${_b64encode(salt)}${_b64encode(key)}'
+
+    def verify(self, password: str, encoded: str) -> bool:
+        _, iterations, salt, key = encoded.split('$')
+        derived = hashlib.pbkdf2_hmac('sha256', password.encode(), _b64decode(salt), int(iterations), KEY_BYTES)
+        return hmac.compare_digest(derived, _b64decode(key))
+
+    def is_current(self, encoded: str) -> bool:
+        return encoded.split('$')[1] == str(self.iterations)
+
+
+class LegacySha256Hasher(Hasher):
+    scheme = 'sha256'
+
+    def encode(self, password: str) -> str:
+        return hashlib.sha256(password.encode()).hexdigest()
+
+    def verify(self, password: str, encoded: str) -> bool:
+        return hmac.compare_digest(self.encode(password), encoded)
+
+
+def build_hasher(name: Optional[str] = None) -> Hasher:
+    name = name or os.environ.get('PASSWORD_HASHER', ScryptHasher.scheme)
+    if name == ScryptHasher.scheme:
+        return ScryptHasher(
+            n=int(os.environ.get('PASSWORD_SCRYPT_N', 2 ** 14)),
+            r=int(os.environ.get('PASSWORD_SCRYPT_R', 8)),
+            p=int(os.environ.get('PASSWORD_SCRYPT_P', 1)),
+        )
+    if name == Pbkdf2Hasher.scheme:
+        return Pbkdf2Hasher(iterations=int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 600000)))
+    raise ValueError(f'Unknown password hasher: {name}')
+
+
+_current: Optional[Hasher] = None
+_verifiers: Dict[str, Hasher] = {
+    ScryptHasher.scheme: ScryptHasher(),
+    Pbkdf2Hasher.scheme: Pbkdf2Hasher(),
+    LegacySha256Hasher.scheme: LegacySha256Hasher(),
+}
+
+
+def current_hasher() -> Hasher:
+    global _current
+    if _current is None:
+        _current = build_hasher()
+    return _current
+
+
+def _hasher_for(encoded: str) -> Optional[Hasher]:
+    if _LEGACY_SHA256.match(encoded):
+        return _verifiers[LegacySha256Hasher.scheme]
+    return _verifiers.get(encoded.split('$', 1)[0])
+
+
+def hash_password(password: str) -> str:
+    return current_hasher().encode(password)
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    hasher = _hasher_for(encoded)
+    if hasher is None:
+        return False
+    try:
+        return hasher.verify(password, encoded)
+    except (ValueError, TypeError):
+        return False
+
+
+def needs_rehash(encoded: str) -> bool:
+    hasher = current_hasher()
+    return not (encoded.startswith(hasher.scheme + '$') and hasher.is_current(encoded))
+
+
+_dummy_hash: Optional[str] = None
+
+
+def dummy_verify(password: str) -> None:
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password(secrets.token_urlsafe(16))
+    verify_password(password, _dummy_hash)
@@ -0,0 +1,72 @@
+'''
+Business: Authentication of the calling user and cached role lookup shared by orders, messages and bookings
+Args: request headers (X-Auth-Token, or X-User-Id when AUTH_ALLOW_USER_ID_HEADER=1); PRINCIPAL_CACHE_TTL, PRINCIPAL_CACHE_SIZE env
+Returns: principal dict {id, role, ...} or None when the caller is unknown
+'''
+
+import functools
+import os
+from typing import Any, Callable, Dict, Optional
+from shared import queries
+from shared.cache import TTLCache
+from shared.http import HttpError, get_header
+from shared.tokens import verify_token
+
+_cache = TTLCache(
+    max_size=int(os.environ.get('PRINCIPAL_CACHE_SIZE', '1024')),
+    ttl=float(os.environ.get('PRINCIPAL_CACHE_TTL', '30')),
+)
+
+
+def get_principal(cur: Any, user_id: int) -> Optional[Dict[str, Any]]:
+    principal = _cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    queries.execute(cur, 'user_principal', (user_id,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+
+    principal = {'id': user_id, 'role': row['role'], 'name': row['name']}
+    _cache.set(user_id, principal)
+    return principal
+
+
+def invalidate(user_id: int) -> bool:
+    return _cache.invalidate(user_id)
+
+
+def cache_stats() -> Dict[str, Any]:
+    return _cache.stats()
+
+
+def authenticate(headers: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    token = get_header(headers, 'X-Auth-Token')
+    if token:
+        claims = verify_token(token)
+        if claims is None:
+            return None
+        return {'id': claims['sub'], 'role': claims['role']}
+
+    if os.environ.get('AUTH_ALLOW_USER_ID_HEADER') == '1':
+        user_id = get_header(headers, 'X-User-Id')
+        if user_id and str(user_id).isdigit():
+            return {'id': int(user_id), 'role': None}
+    return None
+
+
+def resolve_principal(cur: Any, identity: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if identity['role'] is not None:
+        return identity
+    return get_principal(cur, identity['id'])
+
+
+def require_identity(fn: Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]) -> Callable:
+    @functools.wraps(fn)
+    def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        identity = authenticate(event.get('headers') or {})
+        if not identity:
+            raise HttpError(401, 'Требуется авторизация')
+        return fn(event, identity)
+    return wrapper
@@ -0,0 +1,271 @@
+'''
+Business: Registry of fixed SQL statements prepared once per pooled connection
+Args: cursor from a pooled connection, statement name and positional parameters
+Returns: cursor with the EXECUTE result ready for fetchone/fetchall
+'''
+
+from typing import Any, Dict, Sequence, Tuple
+from psycopg2 import errors
+from shared.order_states import transitions_sql
+
+SCHEMA = 't_p57800500_anime_tattoo_website'
+
+ORDER_COLUMNS = 'id, user_id, service_type, description, status, price, payment_method, created_at, updated_at, version'
+
+# Compact attachment metadata per message (id and thumbnail only) so thread loads stay small
+MESSAGE_ATTACHMENTS = f"""(SELECT json_agg(json_build_object(
+                       'id', a.id, 'thumb', b.thumb_status, 'w', b.thumb_width, 'h', b.thumb_height) ORDER BY a.id)
+                   FROM {SCHEMA}.attachments a
+                   JOIN {SCHEMA}.attachment_blobs b ON b.sha256 = a.blob_sha256
+                   WHERE a.message_id = m.id) AS attachments"""
+
+QUERIES: Dict[str, Tuple[Tuple[str, ...], str]] = {
+    'user_principal': (
+        ('integer',),
+        f'SELECT role, name FROM {SCHEMA}.users WHERE id = $1',
+    ),
+    'user_by_email': (
+        ('text',),
+        f"""SELECT id, email, name, role, password_hash
+            FROM {SCHEMA}.users
+            WHERE email = $1""",
+    ),
+    'user_register': (
+        ('text', 'text', 'text'),
+        f"""INSERT INTO {SCHEMA}.users (email, password_hash, name, role)
+            VALUES ($1, $2, $3, 'client')
+            ON CONFLICT (email) DO NOTHING
+            RETURNING id, email, name, role""",
+    ),
+    'user_rehash': (
+        ('integer', 'text', 'text'),
+        f"""UPDATE {SCHEMA}.users
+            SET password_hash = $3
+            WHERE id = $1 AND password_hash = $2""",
+    ),
+    'order_owner': (
+        ('integer',),
+        f'SELECT user_id, status FROM {SCHEMA}.orders WHERE id = $1',
+    ),
+    'order_with_client': (
+        ('integer',),
+        f"""SELECT o.id, o.user_id, o.service_type, o.description, o.status, o.price,
+                   o.payment_method, o.created_at, o.updated_at, o.version,
+                   u.name AS client_name, u.email AS client_email
+            FROM {SCHEMA}.orders o
+            JOIN {SCHEMA}.users u ON o.user_id = u.id
+            WHERE o.id = $1""",
+    ),
+    'order_with_thread': (
+        ('integer', 'integer', 'integer'),
+        f"""SELECT o.id, o.user_id, o.service_type, o.description, o.status, o.price,
+                   o.payment_method, o.created_at, o.updated_at, o.version,
+                   u.name AS client_name, u.email AS client_email,
+                   actor.is_master,
+                   COALESCE(thread.messages, '[]'::json) AS messages,
+                   COALESCE(thread.fetched, 0) AS messages_fetched
+            FROM {SCHEMA}.orders o
+            JOIN {SCHEMA}.users u ON o.user_id = u.id
+            CROSS JOIN (SELECT COALESCE(bool_or(role = 'master'), false) AS is_master
+                        FROM {SCHEMA}.users WHERE id = $2) actor
+            LEFT JOIN LATERAL (
+                SELECT json_agg(recent ORDER BY recent.id) AS messages, COUNT(*) AS fetched
+                FROM (
+                    SELECT m.id, m.order_id, m.sender_id, m.message, m.created_at,
+                           s.name AS sender_name, s.role AS sender_role, {MESSAGE_ATTACHMENTS}
+                    FROM {SCHEMA}.order_messages m
+                    JOIN {SCHEMA}.users s ON m.sender_id = s.id
+                    WHERE m.order_id = o.id
+                    ORDER BY m.id DESC
+                    LIMIT $3
+                ) recent
+            ) thread ON true
+            WHERE o.id = $1""",
+    ),
+    'order_insert': (
+        ('integer', 'text', 'text'),
+        f"""INSERT INTO {SCHEMA}.orders (user_id, service_type, description, status)
+            VALUES ($1, $2, $3, 'pending')
+            RETURNING {ORDER_COLUMNS}""",
+    ),
+    'order_update': (
+        ('integer', 'varchar', 'numeric', 'varchar', 'integer', 'integer'),
+        f"""UPDATE {SCHEMA}.orders o
+            SET status = COALESCE(req.new_status, o.status),
+                price = CASE WHEN req.is_master THEN COALESCE($3, o.price) ELSE o.price END,
+                payment_method = COALESCE($4, o.payment_method),
+                updated_at = CURRENT_TIMESTAMP,
+                version = o.version + 1
+            FROM (
+                SELECT actor.is_master,
+                       COALESCE($2, CASE WHEN actor.is_master AND $3 IS NOT NULL THEN 'priced' END) AS new_status
+                FROM (SELECT COALESCE(bool_or(role = 'master'), false) AS is_master
+                      FROM {SCHEMA}.users WHERE id = $5) actor
+            ) req
+            WHERE o.id = $1
+              AND (req.is_master OR o.user_id = $5)
+              AND ($6 IS NULL OR o.version = $6)
+              AND (req.new_status IS NULL OR req.new_status = o.status OR EXISTS (
+                  SELECT 1 FROM (VALUES {transitions_sql()}) t(from_status, to_status, master_only)
+                  WHERE t.from_status = o.status AND t.to_status = req.new_status
+                    AND (req.is_master OR NOT t.master_only)))
+            RETURNING {ORDER_COLUMNS}""",
+    ),
+    'order_update_check': (
+        ('integer', 'integer'),
+        f"""SELECT o.user_id, o.status, o.version,
+                   COALESCE((SELECT role = 'master' FROM {SCHEMA}.users WHERE id = $2), false) AS is_master
+            FROM {SCHEMA}.orders o
+            WHERE o.id = $1""",
+    ),
+    'order_mark_discussing': (
+        ('integer',),
+        f"""UPDATE {SCHEMA}.orders
+            SET status = 'discussing', updated_at = CURRENT_TIMESTAMP, version = version + 1
+            WHERE id = $1 AND status = 'pending'""",
+    ),
+    'dashboard_summary': (
+        ('integer',),
+        f"""SELECT metric, key, count, amount
+            FROM {SCHEMA}.dashboard_counters
+            UNION ALL
+            SELECT 'unread_messages', '', COALESCE(SUM(unread_count), 0), 0
+            FROM {SCHEMA}.order_read_cursors
+            WHERE user_id = $1 AND unread_count > 0""",
+    ),
+    'messages_by_order': (
+        ('integer',),
+        f"""SELECT m.id, m.order_id, m.sender_id, m.message, m.created_at,
+                   u.name AS sender_name, u.role AS sender_role, {MESSAGE_ATTACHMENTS}
+            FROM {SCHEMA}.order_messages m
+            JOIN {SCHEMA}.users u ON m.sender_id = u.id
+            WHERE m.order_id = $1
+            ORDER BY m.created_at ASC""",
+    ),
+    'messages_last_id': (
+        ('integer',),
+        f"""SELECT COALESCE(MAX(id), 0) AS last_id
+            FROM {SCHEMA}.order_messages
+            WHERE order_id = $1""",
+    ),
+    'messages_pending_thumbs': (
+        ('integer',),
+        f"""SELECT COUNT(*) AS pending
+            FROM {SCHEMA}.attachments a
+            JOIN {SCHEMA}.attachment_blobs b ON b.sha256 = a.blob_sha256
+            WHERE a.order_id = $1 AND a.message_id IS NOT NULL AND b.thumb_status = 'pending'""",
+    ),
+    'messages_since_id': (
+        ('integer', 'integer'),
+        f"""SELECT m.id, m.order_id, m.sender_id, m.message, m.created_at,
+                   u.name AS sender_name, u.role AS sender_role, {MESSAGE_ATTACHMENTS}
+            FROM {SCHEMA}.order_messages m
+            JOIN {SCHEMA}.users u ON m.sender_id = u.id
+            WHERE m.order_id = $1 AND m.id > $2
+            ORDER BY m.id ASC""",
+    ),
+    'messages_before_id': (
+        ('integer', 'integer', 'integer'),
+        f"""SELECT m.id, m.order_id, m.sender_id, m.message, m.created_at,
+                   u.name AS sender_name, u.role AS sender_role, {MESSAGE_ATTACHMENTS}
+            FROM {SCHEMA}.order_messages m
+            JOIN {SCHEMA}.users u ON m.sender_id = u.id
+            WHERE m.order_id = $1 AND m.id < $2
+            ORDER BY m.id DESC
+            LIMIT $3""",
+    ),
+    'messages_since': (
+        ('integer', 'timestamp'),
+        f"""SELECT m.id, m.order_id, m.sender_id, m.message, m.created_at,
+                   u.name AS sender_name, u.role AS sender_role, {MESSAGE_ATTACHMENTS}
+            FROM {SCHEMA}.order_messages m
+            JOIN {SCHEMA}.users u ON m.sender_id = u.id
+            WHERE m.order_id = $1 AND m.created_at > $2
+            ORDER BY m.created_at ASC""",
+    ),
+    'message_insert': (
+        ('integer', 'integer', 'text'),
+        f"""INSERT INTO {SCHEMA}.order_messages (order_id, sender_id, message)
+            VALUES ($1, $2, $3)
+            RETURNING id, order_id, sender_id, message, created_at""",
+    ),
+    'read_cursors_on_message': (
+        ('integer', 'integer', 'integer'),
+        f"""INSERT INTO {SCHEMA}.order_read_cursors AS c (order_id, user_id, last_read_id, unread_count)
+            SELECT $1, p.user_id,
+                   CASE WHEN p.user_id = $2 THEN $3 ELSE 0 END,
+                   CASE WHEN p.user_id = $2 THEN 0 ELSE 1 END
+            FROM (
+                SELECT user_id FROM {SCHEMA}.orders WHERE id = $1
+                UNION
+                SELECT id FROM {SCHEMA}.users WHERE role = 'master'
+            ) p
+            ON CONFLICT (order_id, user_id) DO UPDATE
+            SET unread_count = CASE WHEN c.user_id = $2 THEN 0 ELSE c.unread_count + 1 END,
+                last_read_id = CASE WHEN c.user_id = $2 THEN GREATEST(c.last_read_id, $3) ELSE c.last_read_id END,
+                updated_at = CURRENT_TIMESTAMP""",
+    ),
+    'read_cursor_mark': (
+        ('integer', 'integer', 'integer'),
+        f"""WITH target AS (
+                SELECT COALESCE($3, (SELECT MAX(id) FROM {SCHEMA}.order_messages WHERE order_id = $1), 0) AS read_id
+            )
+            INSERT INTO {SCHEMA}.order_read_cursors AS c (order_id, user_id, last_read_id, unread_count)
+            SELECT $1, $2, target.read_id, (
+                SELECT COUNT(*) FROM {SCHEMA}.order_messages m
+                WHERE m.order_id = $1 AND m.id > target.read_id AND m.sender_id <> $2
+            )
+            FROM target
+            ON CONFLICT (order_id, user_id) DO UPDATE
+            SET last_read_id = GREATEST(c.last_read_id, EXCLUDED.last_read_id),
+                unread_count = (
+                    SELECT COUNT(*) FROM {SCHEMA}.order_messages m
+                    WHERE m.order_id = $1 AND m.sender_id <> $2
+                      AND m.id > GREATEST(c.last_read_id, EXCLUDED.last_read_id)
+                ),
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING order_id, last_read_id, unread_count""",
+    ),
+    'read_cursors_inbox': (
+        ('integer',),
+        f"""SELECT c.order_id, c.unread_count, c.last_read_id, o.status, o.service_type,
+                   u.name AS client_name
+            FROM {SCHEMA}.order_read_cursors c
+            JOIN {SCHEMA}.orders o ON c.order_id = o.id
+            JOIN {SCHEMA}.users u ON o.user_id = u.id
+            WHERE c.user_id = $1 AND c.unread_count > 0
+            ORDER BY c.order_id DESC""",
+    ),
+    'attachments_link_message': (
+        ('integer', 'integer', 'integer', 'integer[]'),
+        f"""UPDATE {SCHEMA}.attachments
+            SET message_id = $2
+            WHERE order_id = $1 AND uploader_id = $3 AND message_id IS NULL AND id = ANY($4)""",
+    ),
+    'message_notify': (
+        ('text', 'text'),
+        'SELECT pg_notify($1, $2)',
+    ),
+}
+
+
+def execute(cur: Any, name: str, params: Sequence[Any] = ()) -> Any:
+    arg_types, sql = QUERIES[name]
+    if len(params) != len(arg_types):
+        raise ValueError(f'{name} expects {len(arg_types)} parameters, got {len(params)}')
+
+    prepared = cur.connection.prepared
+    if name not in prepared:
+        types = f" ({', '.join(arg_types)})" if arg_types else ''
+        cur.execute(f'PREPARE {name}{types} AS {sql}')
+        prepared.add(name)
+
+    try:
+        if params:
+            cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", tuple(params))
+        else:
+            cur.execute(f'EXECUTE {name}')
+    except errors.InvalidSqlStatementName:
+        prepared.discard(name)
+        raise
+    return cur
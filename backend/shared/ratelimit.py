@@ -0,0 +1,113 @@
+'''
+Business: Token-bucket rate limiting per client IP / email in a bounded LRU, with an optional shared Postgres counter
+Args: policies as "N/seconds" specs (env overridable), RATE_LIMIT_MAX_KEYS, RATE_LIMIT_SHARED=1 for multi-instance deployments
+Returns: nothing when allowed, raises HttpError 429 with Retry-After when a bucket is empty
+'''
+
+import math
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from shared.db import connection
+from shared.http import HttpError, get_header
+from shared.queries import SCHEMA
+
+TOO_MANY_REQUESTS = 'Слишком много запросов, попробуйте позже'
+SHARED_CLEANUP_PROBABILITY = 0.001
+
+
+def parse_spec(spec: str) -> Tuple[int, float]:
+    count, _, seconds = spec.partition('/')
+    burst, period = int(count), float(seconds or 60)
+    if burst < 1 or period <= 0:
+        raise ValueError(f'invalid rate limit spec: {spec}')
+    return burst, period
+
+
+class TokenBucketLimiter:
+    def __init__(self, burst: int, period: float, max_keys: int = 10000):
+        self.burst = burst
+        self.period = period
+        self.rate = burst / period
+        self.max_keys = max_keys
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'allowed': 0, 'throttled': 0, 'evictions': 0}
+
+    def take(self, key: str, cost: float = 1.0, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                retry_after = 0.0
+                self._stats['allowed'] += 1
+            else:
+                self._buckets[key] = (tokens, now)
+                retry_after = (cost - tokens) / self.rate
+                self._stats['throttled'] += 1
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self._stats['evictions'] += 1
+        return retry_after
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, 'size': len(self._buckets), 'max_keys': self.max_keys}
+
+
+class Policy:
+    def __init__(self, name: str, default_spec: str):
+        self.name = name
+        self.burst, self.period = parse_spec(os.environ.get(f'RATE_LIMIT_{name.upper()}', default_spec))
+        self.local = TokenBucketLimiter(
+            self.burst, self.period, max_keys=int(os.environ.get('RATE_LIMIT_MAX_KEYS', '10000'))
+        )
+
+
+def shared_enabled() -> bool:
+    return os.environ.get('RATE_LIMIT_SHARED') == '1'
+
+
+def shared_hits(checks: List[Tuple[Policy, str]]) -> float:
+    retry_after = 0.0
+    with connection(autocommit=True) as conn, conn.cursor() as cur:
+        for policy, key in checks:
+            cur.execute(
+                f"""INSERT INTO {SCHEMA}.rate_limit_counters (key, window_start, hits)
+                    VALUES (%s, to_timestamp(floor(extract(epoch FROM now()) / %s) * %s), 1)
+                    ON CONFLICT (key, window_start) DO UPDATE
+                    SET hits = rate_limit_counters.hits + 1
+                    RETURNING hits, extract(epoch FROM window_start - now()) + %s""",
+                (f'{policy.name}:{key}', policy.period, policy.period, policy.period)
+            )
+            hits, remaining = cur.fetchone()
+            if hits > policy.burst:
+                retry_after = max(retry_after, float(remaining))
+        if random.random() < SHARED_CLEANUP_PROBABILITY:
+            cur.execute(f"DELETE FROM {SCHEMA}.rate_limit_counters WHERE window_start < now() - interval '1 day'")
+    return retry_after
+
+
+def client_ip(event: Dict[str, Any]) -> str:
+    source_ip = ((event.get('requestContext') or {}).get('identity') or {}).get('sourceIp')
+    if source_ip:
+        return source_ip
+    forwarded = get_header(event.get('headers'), 'X-Forwarded-For')
+    if forwarded:
+        return forwarded.split(',')[0].strip()
+    return get_header(event.get('headers'), 'X-Real-IP') or 'unknown'
+
+
+def enforce(checks: Iterable[Tuple[Policy, str]]) -> None:
+    checks = [(policy, key) for policy, key in checks if key]
+    retry_after = max((policy.local.take(key) for policy, key in checks), default=0.0)
+    if not retry_after and shared_enabled() and checks:
+        retry_after = shared_hits(checks)
+    if retry_after:
+        raise HttpError(429, TOO_MANY_REQUESTS, {'Retry-After': str(max(1, math.ceil(retry_after)))})
@@ -0,0 +1,31 @@
+'''
+Business: Compact tuple-row fetch path for list endpoints
+Args: plain (tuple) cursor after execute, response shape from ?shape= (objects | rows | columns)
+Returns: column header plus tuples, shaped for json_response without per-row RealDictRow copies
+'''
+
+from typing import Any, Dict, List, Sequence, Tuple
+from shared.http import HttpError
+
+SHAPES = ('objects', 'rows', 'columns')
+
+
+def parse_shape(params: Dict[str, Any]) -> str:
+    shape = params.get('shape') or 'objects'
+    if shape not in SHAPES:
+        raise HttpError(400, f'Параметр shape должен быть одним из: {", ".join(SHAPES)}')
+    return shape
+
+
+def fetch_rowset(cur: Any) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+    columns = [column.name for column in cur.description]
+    return columns, cur.fetchall()
+
+
+def shape_rows(columns: List[str], rows: Sequence[Tuple[Any, ...]], shape: str) -> Any:
+    if shape == 'rows':
+        return {'columns': columns, 'rows': rows}
+    if shape == 'columns':
+        values = list(zip(*rows)) if rows else [() for _ in columns]
+        return {'columns': columns, 'values': values}
+    return [dict(zip(columns, row)) for row in rows]
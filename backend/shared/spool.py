@@ -0,0 +1,113 @@
+'''
+Business: Durable append-only spool for write-behind ingestion - append, claim and replay in batches
+Args: spool directory, fsync flag; drain takes a flush callback and batch size
+Returns: acknowledged appends and drain stats (files, records, batches, corrupt lines)
+'''
+
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List
+
+ACTIVE_NAME = 'spool.ndjson'
+CLAIMED_SUFFIX = '.claimed'
+
+
+class Spool:
+    def __init__(self, directory: str, fsync: bool = True):
+        self.directory = directory
+        self.fsync = fsync
+        self.active_path = os.path.join(directory, ACTIVE_NAME)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._first_append = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_active(self) -> int:
+        while True:
+            fd = os.open(self.active_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_ino == os.stat(self.active_path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode() + b'\n'
+        with self._lock:
+            fd = self._open_active()
+            try:
+                size = os.fstat(fd).st_size
+                if size and os.pread(fd, 1, size - 1) != b'\n':
+                    line = b'\n' + line
+                os.write(fd, line)
+                if self.fsync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+            if not self._pending:
+                self._first_append = time.monotonic()
+            self._pending += 1
+
+    def due(self, batch_size: int, max_age: float) -> bool:
+        with self._lock:
+            if not self._pending:
+                return False
+            return self._pending >= batch_size or time.monotonic() - self._first_append >= max_age
+
+    def claim(self) -> List[str]:
+        with self._lock:
+            if os.path.exists(self.active_path):
+                fd = self._open_active()
+                try:
+                    if os.fstat(fd).st_size:
+                        claimed = os.path.join(self.directory, f'spool.{time.time_ns()}.{os.getpid()}{CLAIMED_SUFFIX}')
+                        os.rename(self.active_path, claimed)
+                finally:
+                    os.close(fd)
+            self._pending = 0
+        return sorted(glob.glob(os.path.join(self.directory, f'*{CLAIMED_SUFFIX}')))
+
+    @staticmethod
+    def read(path: str, stats: Dict[str, int]) -> Iterator[Dict[str, Any]]:
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    stats['corrupt'] += 1
+
+    def drain(self, flush: Callable[[List[Dict[str, Any]]], None], batch_size: int = 500) -> Dict[str, int]:
+        stats = {'files': 0, 'records': 0, 'batches': 0, 'corrupt': 0, 'busy': 0}
+        for path in self.claim():
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    stats['busy'] += 1
+                    continue
+                if not os.path.exists(path):
+                    continue
+                batch: List[Dict[str, Any]] = []
+                for record in self.read(path, stats):
+                    batch.append(record)
+                    if len(batch) >= batch_size:
+                        flush(batch)
+                        stats['batches'] += 1
+                        stats['records'] += len(batch)
+                        batch = []
+                if batch:
+                    flush(batch)
+                    stats['batches'] += 1
+                    stats['records'] += len(batch)
+                os.unlink(path)
+                stats['files'] += 1
+            finally:
+                os.close(fd)
+        return stats
@@ -0,0 +1,119 @@
+'''
+Business: Content-addressed blob storage for attachments - local directory or S3-compatible bucket (boto3 when installed)
+Args: ATTACHMENT_STORAGE (local|s3), ATTACHMENT_STORAGE_DIR, ATTACHMENT_BUCKET, ATTACHMENT_S3_ENDPOINT env; chunks to store
+Returns: sha256 and size of stored content, deduplicated by hash; readable streams of stored blobs
+'''
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Any, BinaryIO, Iterable, Optional, Tuple
+
+try:
+    import boto3
+except ImportError:
+    boto3 = None
+
+CHUNK_SIZE = 64 * 1024
+
+
+class TooLarge(Exception):
+    def __init__(self, limit: int):
+        super().__init__(f'content exceeds {limit} bytes')
+        self.limit = limit
+
+
+def spool_chunks(chunks: Iterable[bytes], max_bytes: int, directory: Optional[str] = None) -> Tuple[str, str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix='upload-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise TooLarge(max_bytes)
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, digest.hexdigest(), size
+
+
+class LocalStorage:
+    def __init__(self, root: str):
+        self.root = root
+        self.tmp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self.path(sha256))
+
+    def put(self, chunks: Iterable[bytes], max_bytes: int) -> Tuple[str, int]:
+        tmp_path, sha256, size = spool_chunks(chunks, max_bytes, self.tmp_dir)
+        target = self.path(sha256)
+        if os.path.exists(target):
+            os.unlink(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(tmp_path, target)
+        return sha256, size
+
+    def open(self, sha256: str) -> BinaryIO:
+        return open(self.path(sha256), 'rb')
+
+
+class S3Storage:
+    def __init__(self, bucket: str, prefix: str = 'attachments/', endpoint_url: Optional[str] = None):
+        if boto3 is None:
+            raise RuntimeError('boto3 is required for ATTACHMENT_STORAGE=s3')
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client('s3', endpoint_url=endpoint_url)
+
+    def key(self, sha256: str) -> str:
+        return f'{self.prefix}{sha256[:2]}/{sha256}'
+
+    def exists(self, sha256: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.key(sha256))
+            return True
+        except self.client.exceptions.ClientError:
+            return False
+
+    def put(self, chunks: Iterable[bytes], max_bytes: int) -> Tuple[str, int]:
+        tmp_path, sha256, size = spool_chunks(chunks, max_bytes)
+        try:
+            if not self.exists(sha256):
+                self.client.upload_file(tmp_path, self.bucket, self.key(sha256))
+        finally:
+            os.unlink(tmp_path)
+        return sha256, size
+
+    def open(self, sha256: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=self.key(sha256))['Body']
+
+
+_storage: Optional[Any] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> Any:
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if os.environ.get('ATTACHMENT_STORAGE', 'local') == 's3':
+                    _storage = S3Storage(
+                        os.environ['ATTACHMENT_BUCKET'],
+                        endpoint_url=os.environ.get('ATTACHMENT_S3_ENDPOINT'),
+                    )
+                else:
+                    _storage = LocalStorage(os.environ.get('ATTACHMENT_STORAGE_DIR', '/tmp/attachments'))
+    return _storage
+
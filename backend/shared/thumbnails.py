@@ -0,0 +1,90 @@
+'''
+Business: Background thumbnail generation for attachment blobs on a bounded worker pool (Pillow when installed)
+Args: THUMBNAIL_WORKERS, THUMBNAIL_SIZE env; blob sha256 values to process
+Returns: thumbnails stored next to originals and attachment_blobs rows marked ready, failed or unavailable
+'''
+
+import io
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, List, Optional, Tuple
+from shared.db import connection
+from shared.queries import SCHEMA
+from shared.storage import get_storage
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def thumbnail_size() -> int:
+    return int(os.environ.get('THUMBNAIL_SIZE', '320'))
+
+
+def render(storage: Any, sha256: str, size: int) -> Tuple[bytes, int, int]:
+    with storage.open(sha256) as f:
+        image = Image.open(f)
+        image.draft('RGB', (size, size))
+        image = image.convert('RGB')
+        image.thumbnail((size, size))
+        out = io.BytesIO()
+        image.save(out, 'WEBP', quality=80)
+    return out.getvalue(), image.width, image.height
+
+
+def process(sha256: str) -> str:
+    if Image is None:
+        status, thumb = 'unavailable', (None, None, None)
+    else:
+        storage = get_storage()
+        try:
+            data, width, height = render(storage, sha256, thumbnail_size())
+            thumb_sha256, _ = storage.put([data], len(data))
+            status, thumb = 'ready', (thumb_sha256, width, height)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            status, thumb = 'failed', (None, None, None)
+
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            f"""UPDATE {SCHEMA}.attachment_blobs
+                SET thumb_status = %s, thumb_sha256 = %s, thumb_width = %s, thumb_height = %s
+                WHERE sha256 = %s""",
+            (status, *thumb, sha256)
+        )
+        conn.commit()
+    return status
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(os.environ.get('THUMBNAIL_WORKERS', '2')),
+                    thread_name_prefix='thumbnail',
+                )
+    return _executor
+
+
+def submit(sha256: str) -> Future:
+    return get_executor().submit(process, sha256)
+
+
+def pending(limit: int) -> List[str]:
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            f"""SELECT sha256 FROM {SCHEMA}.attachment_blobs
+                WHERE thumb_status = 'pending'
+                ORDER BY created_at
+                LIMIT %s""",
+            (limit,)
+        )
+        rows = [row[0] for row in cur.fetchall()]
+        conn.rollback()
+    return rows
@@ -0,0 +1,106 @@
+'''
+Business: Stateless HMAC-signed session tokens carrying user id, role and expiry
+Args: AUTH_TOKEN_KEYS env ("kid:secret,kid:secret", the first key signs, all keys verify), AUTH_TOKEN_TTL seconds
+Returns: token strings "<kid>.<payload>.<signature>" and verified claims without a database lookup
+'''
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_TTL = 7 * 24 * 3600
+
+_keys: Optional[List[Tuple[str, bytes]]] = None
+
+
+class TokenError(Exception):
+    pass
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def parse_keys(spec: str) -> List[Tuple[str, bytes]]:
+    keys = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        kid, sep, secret = item.partition(':')
+        if not sep or not kid or not secret or '.' in kid:
+            raise TokenError('AUTH_TOKEN_KEYS entries must look like "kid:secret"')
+        keys.append((kid, secret.encode()))
+    return keys
+
+
+def load_keys(keys: Optional[List[Tuple[str, bytes]]] = None) -> None:
+    global _keys
+    _keys = keys if keys is not None else parse_keys(os.environ.get('AUTH_TOKEN_KEYS', ''))
+
+
+def _get_keys() -> List[Tuple[str, bytes]]:
+    if _keys is None:
+        load_keys()
+    return _keys
+
+
+def can_issue() -> bool:
+    try:
+        return bool(_get_keys())
+    except TokenError:
+        return False
+
+
+def _sign(secret: bytes, message: bytes) -> bytes:
+    return hmac.new(secret, message, hashlib.sha256).digest()
+
+
+def issue_token(user_id: int, role: str, ttl: Optional[int] = None) -> str:
+    keys = _get_keys()
+    if not keys:
+        raise TokenError('AUTH_TOKEN_KEYS is not configured')
+    kid, secret = keys[0]
+    if ttl is None:
+        ttl = int(os.environ.get('AUTH_TOKEN_TTL', DEFAULT_TTL))
+    claims = {'sub': user_id, 'role': role, 'exp': int(time.time()) + ttl}
+    payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+    signing_input = f'{kid}.{payload}'.encode()
+    return f'{kid}.{payload}.{_b64encode(_sign(secret, signing_input))}'
+
+
+def verify_token(token: str) -> Optional[Dict[str, Any]]:
+    parts = token.split('.')
+    if len(parts) != 3:
+        return None
+    kid, payload, signature = parts
+
+    secret = None
+    for key_id, key_secret in _get_keys():
+        if key_id == kid:
+            secret = key_secret
+            break
+    if secret is None:
+        return None
+
+    try:
+        expected = _sign(secret, f'{kid}.{payload}'.encode())
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, TypeError):
+        return None
+
+    if not isinstance(claims, dict) or claims.get('exp', 0) <= time.time():
+        return None
+    if not isinstance(claims.get('sub'), int) or not isinstance(claims.get('role'), str):
+        return None
+    return claims
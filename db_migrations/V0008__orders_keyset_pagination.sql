@@ -0,0 +1,20 @@
+-- Ключ постраничной выборки заказов (created_at, id) не должен содержать NULL
+UPDATE t_p57800500_anime_tattoo_website.orders
+SET created_at = CURRENT_TIMESTAMP
+WHERE created_at IS NULL;
+
+ALTER TABLE t_p57800500_anime_tattoo_website.orders
+    ALTER COLUMN created_at SET NOT NULL;
+
+-- Составные индексы для keyset-пагинации: общий список мастера,
+-- фильтр по статусу и список заказов клиента
+CREATE INDEX idx_orders_created_at_id
+    ON t_p57800500_anime_tattoo_website.orders(created_at DESC, id DESC);
+CREATE INDEX idx_orders_status_created_at_id
+    ON t_p57800500_anime_tattoo_website.orders(status, created_at DESC, id DESC);
+CREATE INDEX idx_orders_user_id_created_at_id
+    ON t_p57800500_anime_tattoo_website.orders(user_id, created_at DESC, id DESC);
+
+-- Старые одноколоночные индексы покрываются составными
+DROP INDEX IF EXISTS t_p57800500_anime_tattoo_website.idx_orders_status;
+DROP INDEX IF EXISTS t_p57800500_anime_tattoo_website.idx_orders_user_id;
@@ -0,0 +1,7 @@
+-- Индекс для инкрементальной выборки сообщений (since_id) и дешёвого
+-- токена изменений MAX(id) по заказу
+CREATE INDEX idx_order_messages_order_id_id
+    ON t_p57800500_anime_tattoo_website.order_messages(order_id, id);
+
+-- Одноколоночный индекс покрывается составным
+DROP INDEX IF EXISTS t_p57800500_anime_tattoo_website.idx_order_messages_order_id;
@@ -0,0 +1,29 @@
+-- Окончание сеанса: длительность берётся из услуги (верхняя граница диапазона часов),
+-- для "Несколько сеансов" и неизвестных значений - 4 часа
+ALTER TABLE t_p57800500_anime_tattoo_website.bookings
+    ADD COLUMN ends_at TIMESTAMP;
+
+UPDATE t_p57800500_anime_tattoo_website.bookings b
+SET ends_at = b.booking_date + CASE s.duration
+        WHEN '1-2 часа' THEN interval '2 hours'
+        WHEN '2-4 часа' THEN interval '4 hours'
+        WHEN '4-8 часов' THEN interval '8 hours'
+        ELSE interval '4 hours'
+    END
+FROM t_p57800500_anime_tattoo_website.services s
+WHERE b.service_id = s.id;
+
+UPDATE t_p57800500_anime_tattoo_website.bookings
+SET ends_at = booking_date + interval '4 hours'
+WHERE ends_at IS NULL;
+
+ALTER TABLE t_p57800500_anime_tattoo_website.bookings
+    ALTER COLUMN ends_at SET NOT NULL,
+    ADD CONSTRAINT bookings_ends_after_start CHECK (ends_at > booking_date);
+
+-- Поиск пересечений активных записей: booking_date < :end AND ends_at > :start
+CREATE INDEX idx_bookings_active_interval
+    ON t_p57800500_anime_tattoo_website.bookings(booking_date, ends_at)
+    WHERE status IN ('pending', 'confirmed');
+
+COMMENT ON COLUMN t_p57800500_anime_tattoo_website.bookings.ends_at IS 'Окончание сеанса, вычисляется из длительности услуги при создании записи';
@@ -0,0 +1,135 @@
+-- Сводка для панели мастера: агрегаты обновляются триггерами при каждой записи,
+-- чтение сводки - один запрос к маленькой таблице без сканирования заказов
+CREATE TABLE t_p57800500_anime_tattoo_website.dashboard_counters (
+    metric VARCHAR(50) NOT NULL,
+    key VARCHAR(100) NOT NULL DEFAULT '',
+    count BIGINT NOT NULL DEFAULT 0,
+    amount NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (metric, key)
+);
+
+COMMENT ON TABLE t_p57800500_anime_tattoo_website.dashboard_counters IS 'Материализованная сводка панели мастера: orders_by_status, revenue_by_payment, pending_bookings, unread_messages';
+
+-- Непрочитанные мастером сообщения клиента (с момента последнего ответа в заказе)
+ALTER TABLE t_p57800500_anime_tattoo_website.orders
+    ADD COLUMN unread_by_master INTEGER NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION t_p57800500_anime_tattoo_website.dashboard_bump(
+    p_metric VARCHAR, p_key VARCHAR, p_count BIGINT, p_amount NUMERIC
+) RETURNS VOID AS $$
+BEGIN
+    IF p_count = 0 AND p_amount = 0 THEN
+        RETURN;
+    END IF;
+    INSERT INTO t_p57800500_anime_tattoo_website.dashboard_counters (metric, key, count, amount)
+    VALUES (p_metric, p_key, p_count, p_amount)
+    ON CONFLICT (metric, key) DO UPDATE
+    SET count = dashboard_counters.count + EXCLUDED.count,
+        amount = dashboard_counters.amount + EXCLUDED.amount;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Выручка считается по оплаченным и завершенным заказам с выставленной ценой
+CREATE OR REPLACE FUNCTION t_p57800500_anime_tattoo_website.dashboard_orders_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM t_p57800500_anime_tattoo_website.dashboard_bump('orders_by_status', OLD.status, -1, 0);
+        IF OLD.status IN ('paid', 'completed') AND OLD.price IS NOT NULL THEN
+            PERFORM t_p57800500_anime_tattoo_website.dashboard_bump(
+                'revenue_by_payment', COALESCE(OLD.payment_method, 'unknown'), -1, -OLD.price);
+        END IF;
+        PERFORM t_p57800500_anime_tattoo_website.dashboard_bump('unread_messages', '', -OLD.unread_by_master, 0);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM t_p57800500_anime_tattoo_website.dashboard_bump('orders_by_status', NEW.status, 1, 0);
+        IF NEW.status IN ('paid', 'completed') AND NEW.price IS NOT NULL THEN
+            PERFORM t_p57800500_anime_tattoo_website.dashboard_bump(
+                'revenue_by_payment', COALESCE(NEW.payment_method, 'unknown'), 1, NEW.price);
+        END IF;
+        PERFORM t_p57800500_anime_tattoo_website.dashboard_bump('unread_messages', '', NEW.unread_by_master, 0);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER orders_dashboard_insert_delete
+    AFTER INSERT OR DELETE ON t_p57800500_anime_tattoo_website.orders
+    FOR EACH ROW EXECUTE FUNCTION t_p57800500_anime_tattoo_website.dashboard_orders_trigger();
+
+CREATE TRIGGER orders_dashboard_update
+    AFTER UPDATE OF status, price, payment_method, unread_by_master ON t_p57800500_anime_tattoo_website.orders
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.price IS DISTINCT FROM NEW.price
+          OR OLD.payment_method IS DISTINCT FROM NEW.payment_method
+          OR OLD.unread_by_master IS DISTINCT FROM NEW.unread_by_master)
+    EXECUTE FUNCTION t_p57800500_anime_tattoo_website.dashboard_orders_trigger();
+
+-- Сообщение клиента увеличивает счетчик непрочитанных, ответ мастера его сбрасывает;
+-- общий счетчик unread_messages обновляет триггер заказов
+CREATE OR REPLACE FUNCTION t_p57800500_anime_tattoo_website.dashboard_messages_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE t_p57800500_anime_tattoo_website.orders
+    SET unread_by_master = CASE WHEN user_id = NEW.sender_id THEN unread_by_master + 1 ELSE 0 END
+    WHERE id = NEW.order_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER order_messages_dashboard
+    AFTER INSERT ON t_p57800500_anime_tattoo_website.order_messages
+    FOR EACH ROW EXECUTE FUNCTION t_p57800500_anime_tattoo_website.dashboard_messages_trigger();
+
+CREATE OR REPLACE FUNCTION t_p57800500_anime_tattoo_website.dashboard_bookings_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'pending' THEN
+        PERFORM t_p57800500_anime_tattoo_website.dashboard_bump('pending_bookings', '', -1, 0);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'pending' THEN
+        PERFORM t_p57800500_anime_tattoo_website.dashboard_bump('pending_bookings', '', 1, 0);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER bookings_dashboard_insert_delete
+    AFTER INSERT OR DELETE ON t_p57800500_anime_tattoo_website.bookings
+    FOR EACH ROW EXECUTE FUNCTION t_p57800500_anime_tattoo_website.dashboard_bookings_trigger();
+
+CREATE TRIGGER bookings_dashboard_update
+    AFTER UPDATE OF status ON t_p57800500_anime_tattoo_website.bookings
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION t_p57800500_anime_tattoo_website.dashboard_bookings_trigger();
+
+-- Начальное заполнение по существующим данным (единственный полный проход)
+UPDATE t_p57800500_anime_tattoo_website.orders o
+SET unread_by_master = (
+    SELECT COUNT(*) FROM t_p57800500_anime_tattoo_website.order_messages m
+    WHERE m.order_id = o.id
+      AND m.sender_id = o.user_id
+      AND m.id > COALESCE((
+          SELECT MAX(r.id) FROM t_p57800500_anime_tattoo_website.order_messages r
+          WHERE r.order_id = o.id AND r.sender_id <> o.user_id
+      ), 0)
+);
+
+TRUNCATE t_p57800500_anime_tattoo_website.dashboard_counters;
+
+INSERT INTO t_p57800500_anime_tattoo_website.dashboard_counters (metric, key, count, amount)
+SELECT 'orders_by_status', status, COUNT(*), 0
+FROM t_p57800500_anime_tattoo_website.orders GROUP BY status
+UNION ALL
+SELECT 'revenue_by_payment', COALESCE(payment_method, 'unknown'), COUNT(*), SUM(price)
+FROM t_p57800500_anime_tattoo_website.orders
+WHERE status IN ('paid', 'completed') AND price IS NOT NULL
+GROUP BY COALESCE(payment_method, 'unknown')
+UNION ALL
+SELECT 'pending_bookings', '', COUNT(*), 0
+FROM t_p57800500_anime_tattoo_website.bookings WHERE status = 'pending'
+UNION ALL
+SELECT 'unread_messages', '', COALESCE(SUM(unread_by_master), 0), 0
+FROM t_p57800500_anime_tattoo_website.orders;
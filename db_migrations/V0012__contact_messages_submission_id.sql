@@ -0,0 +1,9 @@
+-- Идентификатор заявки генерируется при приеме формы: повторная загрузка спула
+-- после сбоя не создает дубликатов (ON CONFLICT (submission_id) DO NOTHING)
+ALTER TABLE t_p57800500_anime_tattoo_website.contact_messages
+    ADD COLUMN submission_id UUID;
+
+CREATE UNIQUE INDEX idx_contact_messages_submission_id
+    ON t_p57800500_anime_tattoo_website.contact_messages(submission_id);
+
+COMMENT ON COLUMN t_p57800500_anime_tattoo_website.contact_messages.submission_id IS 'Идентификатор заявки из спула контактной формы';
@@ -0,0 +1,6 @@
+-- Версия заказа для оптимистичной блокировки: каждое изменение увеличивает version,
+-- PUT с устаревшей версией получает 409 вместо потерянного обновления
+ALTER TABLE t_p57800500_anime_tattoo_website.orders
+    ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+
+COMMENT ON COLUMN t_p57800500_anime_tattoo_website.orders.version IS 'Номер версии заказа, увеличивается при каждом обновлении (оптимистичная блокировка)';
@@ -0,0 +1,29 @@
+-- Курсоры прочтения чатов: последний прочитанный id и денормализованный счетчик
+-- непрочитанных для каждого участника заказа (клиент-владелец и мастер)
+CREATE TABLE t_p57800500_anime_tattoo_website.order_read_cursors (
+    order_id INTEGER NOT NULL REFERENCES t_p57800500_anime_tattoo_website.orders(id),
+    user_id INTEGER NOT NULL REFERENCES t_p57800500_anime_tattoo_website.users(id),
+    last_read_id INTEGER NOT NULL DEFAULT 0,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (order_id, user_id)
+);
+
+-- Входящие пользователя: только заказы с непрочитанными сообщениями
+CREATE INDEX idx_order_read_cursors_unread
+    ON t_p57800500_anime_tattoo_website.order_read_cursors(user_id, order_id DESC)
+    WHERE unread_count > 0;
+
+COMMENT ON TABLE t_p57800500_anime_tattoo_website.order_read_cursors IS 'Курсоры прочтения чата заказа по участникам, счетчик обновляется в транзакции отправки сообщения';
+
+-- Существующая переписка считается прочитанной
+INSERT INTO t_p57800500_anime_tattoo_website.order_read_cursors (order_id, user_id, last_read_id, unread_count)
+SELECT o.id, p.user_id, COALESCE((
+           SELECT MAX(m.id) FROM t_p57800500_anime_tattoo_website.order_messages m WHERE m.order_id = o.id
+       ), 0), 0
+FROM t_p57800500_anime_tattoo_website.orders o
+CROSS JOIN LATERAL (
+    SELECT o.user_id
+    UNION
+    SELECT u.id FROM t_p57800500_anime_tattoo_website.users u WHERE u.role = 'master'
+) p;
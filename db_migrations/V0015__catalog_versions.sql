@@ -0,0 +1,33 @@
+-- Версия каталога (портфолио, услуги, отзывы): любое изменение таблиц увеличивает номер,
+-- функция catalog перечитывает снимок только при смене версии
+CREATE TABLE t_p57800500_anime_tattoo_website.catalog_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO t_p57800500_anime_tattoo_website.catalog_versions (name) VALUES ('catalog');
+
+CREATE OR REPLACE FUNCTION t_p57800500_anime_tattoo_website.catalog_bump_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE t_p57800500_anime_tattoo_website.catalog_versions
+    SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+    WHERE name = 'catalog';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER portfolio_catalog_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p57800500_anime_tattoo_website.portfolio
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p57800500_anime_tattoo_website.catalog_bump_version();
+
+CREATE TRIGGER services_catalog_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p57800500_anime_tattoo_website.services
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p57800500_anime_tattoo_website.catalog_bump_version();
+
+CREATE TRIGGER reviews_catalog_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p57800500_anime_tattoo_website.reviews
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p57800500_anime_tattoo_website.catalog_bump_version();
+
+CREATE INDEX idx_portfolio_category ON t_p57800500_anime_tattoo_website.portfolio(category);
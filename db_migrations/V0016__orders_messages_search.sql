@@ -0,0 +1,25 @@
+-- Полнотекстовый поиск мастера по заказам и переписке (конфигурация russian)
+-- Векторы - генерируемые столбцы, поэтому поддерживаются при каждой записи без триггеров
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE t_p57800500_anime_tattoo_website.orders
+    ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', COALESCE(service_type, '')), 'A') ||
+        setweight(to_tsvector('russian', COALESCE(description, '')), 'B')
+    ) STORED;
+
+ALTER TABLE t_p57800500_anime_tattoo_website.order_messages
+    ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', message), 'C')
+    ) STORED;
+
+CREATE INDEX idx_orders_search_vector
+    ON t_p57800500_anime_tattoo_website.orders USING GIN (search_vector);
+CREATE INDEX idx_order_messages_search_vector
+    ON t_p57800500_anime_tattoo_website.order_messages USING GIN (search_vector);
+
+-- Нечеткий поиск по имени и email клиента (опечатки, части слов)
+CREATE INDEX idx_users_name_trgm
+    ON t_p57800500_anime_tattoo_website.users USING GIN (name gin_trgm_ops);
+CREATE INDEX idx_users_email_trgm
+    ON t_p57800500_anime_tattoo_website.users USING GIN (email gin_trgm_ops);
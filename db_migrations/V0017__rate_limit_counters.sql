@@ -0,0 +1,11 @@
+-- Общие счетчики ограничения частоты запросов для нескольких экземпляров функций
+-- (включаются RATE_LIMIT_SHARED=1), окно фиксированной длины на ключ политики
+CREATE TABLE t_p57800500_anime_tattoo_website.rate_limit_counters (
+    key VARCHAR(320) NOT NULL,
+    window_start TIMESTAMPTZ NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (key, window_start)
+);
+
+CREATE INDEX idx_rate_limit_counters_window_start
+    ON t_p57800500_anime_tattoo_website.rate_limit_counters(window_start);
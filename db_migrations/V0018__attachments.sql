@@ -0,0 +1,30 @@
+-- Вложения (референсы) к заказам и сообщениям. Содержимое хранится по sha256
+-- и не дублируется: одинаковые файлы разных загрузок ссылаются на одну запись
+CREATE TABLE t_p57800500_anime_tattoo_website.attachment_blobs (
+    sha256 CHAR(64) PRIMARY KEY,
+    size_bytes INTEGER NOT NULL,
+    content_type VARCHAR(50) NOT NULL,
+    thumb_status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    thumb_sha256 CHAR(64),
+    thumb_width INTEGER,
+    thumb_height INTEGER,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE t_p57800500_anime_tattoo_website.attachments (
+    id SERIAL PRIMARY KEY,
+    order_id INTEGER NOT NULL REFERENCES t_p57800500_anime_tattoo_website.orders(id),
+    message_id INTEGER REFERENCES t_p57800500_anime_tattoo_website.order_messages(id),
+    uploader_id INTEGER NOT NULL REFERENCES t_p57800500_anime_tattoo_website.users(id),
+    blob_sha256 CHAR(64) NOT NULL REFERENCES t_p57800500_anime_tattoo_website.attachment_blobs(sha256),
+    file_name VARCHAR(255),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_attachments_order_id ON t_p57800500_anime_tattoo_website.attachments(order_id, id);
+CREATE INDEX idx_attachments_message_id ON t_p57800500_anime_tattoo_website.attachments(message_id)
+    WHERE message_id IS NOT NULL;
+CREATE INDEX idx_attachment_blobs_pending ON t_p57800500_anime_tattoo_website.attachment_blobs(created_at)
+    WHERE thumb_status = 'pending';
+
+COMMENT ON COLUMN t_p57800500_anime_tattoo_website.attachment_blobs.thumb_status IS 'Статус миниатюры: pending, ready, failed, unavailable (нет Pillow)';
@@ -0,0 +1,12 @@
+-- Ключи идемпотентности для создания заказов, записей и заявок: сохраненный ответ
+-- первого успешного запроса возвращается при повторе с тем же Idempotency-Key
+CREATE TABLE t_p57800500_anime_tattoo_website.idempotency_keys (
+    key TEXT PRIMARY KEY,
+    fingerprint CHAR(64) NOT NULL,
+    response JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX idx_idempotency_keys_expires_at
+    ON t_p57800500_anime_tattoo_website.idempotency_keys(expires_at);
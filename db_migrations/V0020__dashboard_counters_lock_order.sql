@@ -0,0 +1,37 @@
+-- Триггер заказов обновляет счетчики сводки одним INSERT в фиксированном порядке (metric, key):
+-- параллельные транзакции блокируют строки dashboard_counters в одном порядке и не попадают
+-- во взаимную блокировку. Дельты по одному ключу складываются, нулевые пропускаются, поэтому
+-- изменение только unread_by_master больше не трогает строки orders_by_status и revenue_by_payment
+CREATE OR REPLACE FUNCTION t_p57800500_anime_tattoo_website.dashboard_orders_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO t_p57800500_anime_tattoo_website.dashboard_counters AS c (metric, key, count, amount)
+    SELECT d.metric, d.key, SUM(d.count), SUM(d.amount)
+    FROM (
+        SELECT 'orders_by_status'::varchar AS metric, OLD.status::varchar AS key, -1 AS count, 0::numeric AS amount
+        WHERE TG_OP IN ('UPDATE', 'DELETE')
+        UNION ALL
+        SELECT 'revenue_by_payment', COALESCE(OLD.payment_method, 'unknown'), -1, -OLD.price
+        WHERE TG_OP IN ('UPDATE', 'DELETE') AND OLD.status IN ('paid', 'completed') AND OLD.price IS NOT NULL
+        UNION ALL
+        SELECT 'unread_messages', '', -OLD.unread_by_master, 0
+        WHERE TG_OP IN ('UPDATE', 'DELETE')
+        UNION ALL
+        SELECT 'orders_by_status', NEW.status, 1, 0
+        WHERE TG_OP IN ('INSERT', 'UPDATE')
+        UNION ALL
+        SELECT 'revenue_by_payment', COALESCE(NEW.payment_method, 'unknown'), 1, NEW.price
+        WHERE TG_OP IN ('INSERT', 'UPDATE') AND NEW.status IN ('paid', 'completed') AND NEW.price IS NOT NULL
+        UNION ALL
+        SELECT 'unread_messages', '', NEW.unread_by_master, 0
+        WHERE TG_OP IN ('INSERT', 'UPDATE')
+    ) d
+    GROUP BY d.metric, d.key
+    HAVING SUM(d.count) <> 0 OR SUM(d.amount) <> 0
+    ORDER BY d.metric, d.key
+    ON CONFLICT (metric, key) DO UPDATE
+    SET count = c.count + EXCLUDED.count,
+        amount = c.amount + EXCLUDED.amount;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
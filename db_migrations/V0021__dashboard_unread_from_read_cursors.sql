@@ -0,0 +1,49 @@
+-- Непрочитанные в сводке мастера считаются по его курсорам прочтения (order_read_cursors),
+-- как во входящих: отметка о прочтении сразу уменьшает и сводку. Отдельный счетчик
+-- orders.unread_by_master, его триггер и строка unread_messages в dashboard_counters удаляются
+DROP TRIGGER order_messages_dashboard ON t_p57800500_anime_tattoo_website.order_messages;
+DROP FUNCTION t_p57800500_anime_tattoo_website.dashboard_messages_trigger();
+
+DROP TRIGGER orders_dashboard_update ON t_p57800500_anime_tattoo_website.orders;
+
+CREATE OR REPLACE FUNCTION t_p57800500_anime_tattoo_website.dashboard_orders_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO t_p57800500_anime_tattoo_website.dashboard_counters AS c (metric, key, count, amount)
+    SELECT d.metric, d.key, SUM(d.count), SUM(d.amount)
+    FROM (
+        SELECT 'orders_by_status'::varchar AS metric, OLD.status::varchar AS key, -1 AS count, 0::numeric AS amount
+        WHERE TG_OP IN ('UPDATE', 'DELETE')
+        UNION ALL
+        SELECT 'revenue_by_payment', COALESCE(OLD.payment_method, 'unknown'), -1, -OLD.price
+        WHERE TG_OP IN ('UPDATE', 'DELETE') AND OLD.status IN ('paid', 'completed') AND OLD.price IS NOT NULL
+        UNION ALL
+        SELECT 'orders_by_status', NEW.status, 1, 0
+        WHERE TG_OP IN ('INSERT', 'UPDATE')
+        UNION ALL
+        SELECT 'revenue_by_payment', COALESCE(NEW.payment_method, 'unknown'), 1, NEW.price
+        WHERE TG_OP IN ('INSERT', 'UPDATE') AND NEW.status IN ('paid', 'completed') AND NEW.price IS NOT NULL
+    ) d
+    GROUP BY d.metric, d.key
+    HAVING SUM(d.count) <> 0 OR SUM(d.amount) <> 0
+    ORDER BY d.metric, d.key
+    ON CONFLICT (metric, key) DO UPDATE
+    SET count = c.count + EXCLUDED.count,
+        amount = c.amount + EXCLUDED.amount;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER orders_dashboard_update
+    AFTER UPDATE OF status, price, payment_method ON t_p57800500_anime_tattoo_website.orders
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.price IS DISTINCT FROM NEW.price
+          OR OLD.payment_method IS DISTINCT FROM NEW.payment_method)
+    EXECUTE FUNCTION t_p57800500_anime_tattoo_website.dashboard_orders_trigger();
+
+ALTER TABLE t_p57800500_anime_tattoo_website.orders DROP COLUMN unread_by_master;
+
+DELETE FROM t_p57800500_anime_tattoo_website.dashboard_counters WHERE metric = 'unread_messages';
+
+COMMENT ON TABLE t_p57800500_anime_tattoo_website.dashboard_counters IS 'Материализованная сводка панели мастера: orders_by_status, revenue_by_payment, pending_bookings';
@@ -150,5 +150,10 @@ export const storage = {
   clearAuth() {
     localStorage.removeItem('user');
     localStorage.removeItem('token');
+  },
+
+  authHeaders(): Record<string, string> {
+    const token = localStorage.getItem('token');
+    return token ? { 'X-Auth-Token': token } : {};
   }
 };
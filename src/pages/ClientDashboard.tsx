@@ -6,6 +6,7 @@ import { Badge } from '@/components/ui/badge';
 import { Textarea } from '@/components/ui/textarea';
 import { useToast } from '@/hooks/use-toast';
 import Icon from '@/components/ui/icon';
+import { storage } from '@/lib/api';
 import { Separator } from '@/components/ui/separator';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 
@@ -17,6 +18,7 @@ interface Order {
   price: number | null;
   payment_method: string | null;
   created_at: string;
+  version: number;
 }
 
 interface Message {
@@ -76,7 +78,7 @@ const ClientDashboard = () => {
     try {
       const response = await fetch('https://functions.poehali.dev/70a8d501-1b95-4105-97ed-d5928e0e12d5', {
         headers: {
-          'X-User-Id': userId!,
+          ...storage.authHeaders(),
         },
       });
       const data = await response.json();
@@ -108,7 +110,7 @@ const ClientDashboard = () => {
     try {
       const response = await fetch(`https://functions.poehali.dev/702e7931-41cc-45a8-ad61-5ca8fc761bab?order_id=${orderId}`, {
         headers: {
-          'X-User-Id': userId!,
+          ...storage.authHeaders(),
         },
       });
       const data = await response.json();
@@ -144,7 +146,7 @@ const ClientDashboard = () => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'X-User-Id': userId!,
+          ...storage.authHeaders(),
         },
         body: JSON.stringify({
           order_id: selectedOrder.id,
@@ -156,22 +158,46 @@ const ClientDashboard = () => {
     }
   };
 
+  const reloadOrder = async (orderId: number) => {
+    const response = await fetch(`https://functions.poehali.dev/70a8d501-1b95-4105-97ed-d5928e0e12d5?id=${orderId}`, {
+      headers: {
+        ...storage.authHeaders(),
+      },
+    });
+    if (!response.ok) return;
+    const fresh: Order = await response.json();
+    setOrders((prev) => prev.map((o) => (o.id === fresh.id ? { ...o, ...fresh } : o)));
+    setSelectedOrder((prev) => (prev && prev.id === fresh.id ? { ...prev, ...fresh } : prev));
+  };
+
   const handlePayment = async () => {
     if (!selectedOrder || !paymentMethod) return;
 
     try {
-      await fetch('https://functions.poehali.dev/70a8d501-1b95-4105-97ed-d5928e0e12d5', {
+      const response = await fetch('https://functions.poehali.dev/70a8d501-1b95-4105-97ed-d5928e0e12d5', {
         method: 'PUT',
         headers: {
           'Content-Type': 'application/json',
-          'X-User-Id': userId!,
+          ...storage.authHeaders(),
         },
         body: JSON.stringify({
           order_id: selectedOrder.id,
           payment_method: paymentMethod,
           status: 'paid',
+          version: selectedOrder.version,
         }),
       });
+      if (response.status === 409) {
+        const conflict = await response.json();
+        await reloadOrder(selectedOrder.id);
+        toast({
+          title: 'Конфликт изменений',
+          description: conflict.error || 'Заказ уже изменен, данные обновлены',
+          variant: 'destructive',
+        });
+        return;
+      }
+      if (!response.ok) throw new Error('update failed');
 
       toast({
         title: 'Успешно!',
@@ -225,6 +251,7 @@ const ClientDashboard = () => {
               Новый заказ
             </Button>
             <Button variant="outline" onClick={() => {
+              storage.clearAuth();
               localStorage.removeItem('userId');
               localStorage.removeItem('userName');
               navigate('/');
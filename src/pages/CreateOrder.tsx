@@ -7,6 +7,7 @@ import { Textarea } from '@/components/ui/textarea';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 import { useToast } from '@/hooks/use-toast';
 import Icon from '@/components/ui/icon';
+import { storage } from '@/lib/api';
 
 const CreateOrder = () => {
   const navigate = useNavigate();
@@ -14,6 +15,7 @@ const CreateOrder = () => {
   const [serviceType, setServiceType] = useState('');
   const [description, setDescription] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const [idempotencyKey] = useState(() => crypto.randomUUID());
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
@@ -40,7 +42,8 @@ const CreateOrder = () => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'X-User-Id': userId,
+          ...storage.authHeaders(),
+          'Idempotency-Key': idempotencyKey,
         },
         body: JSON.stringify({
           service_type: serviceType,
@@ -35,14 +35,11 @@ function Index() {
   }, []);
 
   useEffect(() => {
-    const userId = localStorage.getItem('userId');
-    const userName = localStorage.getItem('userName');
-    const userRole = localStorage.getItem('userRole');
+    const auth = storage.getAuth();
     
-    if (userId && userName) {
-      const mockUser = { id: parseInt(userId), name: userName, email: '', role: userRole || 'client' };
-      setUser(mockUser);
-      setToken('mock-token');
+    if (auth) {
+      setUser(auth.user);
+      setToken(auth.token);
     }
   }, []);
 
@@ -51,17 +48,17 @@ function Index() {
     setIsLoading(true);
     
     try {
-      const userId = Math.random().toString(36).substring(7);
-      const userName = authMode === 'register' ? formData.name : formData.email.split('@')[0];
-      const userRole = formData.email.includes('master') ? 'master' : 'client';
+      const { user: authUser, token: authToken } = authMode === 'login'
+        ? await api.login(formData.email, formData.password)
+        : await api.register(formData.email, formData.password, formData.name);
       
-      localStorage.setItem('userId', userId);
-      localStorage.setItem('userName', userName);
-      localStorage.setItem('userRole', userRole);
+      storage.saveAuth(authUser, authToken);
+      localStorage.setItem('userId', authUser.id.toString());
+      localStorage.setItem('userName', authUser.name);
+      localStorage.setItem('userRole', authUser.role);
       
-      const mockUser = { id: parseInt(userId), name: userName, email: formData.email, role: userRole };
-      setUser(mockUser);
-      setToken('mock-token');
+      setUser(authUser);
+      setToken(authToken);
       setIsAuthOpen(false);
       
       toast({
@@ -69,7 +66,7 @@ function Index() {
         description: authMode === 'login' ? 'Вы вошли в систему' : 'Регистрация завершена'
       });
       
-      if (userRole === 'master') {
+      if (authUser.role === 'master') {
         navigate('/master-dashboard');
       } else {
         navigate('/client-dashboard');
@@ -90,6 +87,7 @@ function Index() {
   const handleLogout = () => {
     setUser(null);
     setToken(null);
+    storage.clearAuth();
     localStorage.removeItem('userId');
     localStorage.removeItem('userName');
     localStorage.removeItem('userRole');
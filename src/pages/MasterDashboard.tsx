@@ -8,6 +8,7 @@ import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
 import { useToast } from '@/hooks/use-toast';
 import Icon from '@/components/ui/icon';
+import { storage } from '@/lib/api';
 import { Separator } from '@/components/ui/separator';
 
 interface Order {
@@ -21,6 +22,7 @@ interface Order {
   price: number | null;
   payment_method: string | null;
   created_at: string;
+  version: number;
 }
 
 interface Message {
@@ -77,7 +79,7 @@ const MasterDashboard = () => {
     try {
       const response = await fetch('https://functions.poehali.dev/70a8d501-1b95-4105-97ed-d5928e0e12d5', {
         headers: {
-          'X-User-Id': userId!,
+          ...storage.authHeaders(),
         },
       });
       const data = await response.json();
@@ -110,7 +112,7 @@ const MasterDashboard = () => {
     try {
       const response = await fetch(`https://functions.poehali.dev/702e7931-41cc-45a8-ad61-5ca8fc761bab?order_id=${orderId}`, {
         headers: {
-          'X-User-Id': userId!,
+          ...storage.authHeaders(),
         },
       });
       const data = await response.json();
@@ -146,7 +148,7 @@ const MasterDashboard = () => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'X-User-Id': userId!,
+          ...storage.authHeaders(),
         },
         body: JSON.stringify({
           order_id: selectedOrder.id,
@@ -158,21 +160,46 @@ const MasterDashboard = () => {
     }
   };
 
+  const reloadOrder = async (orderId: number) => {
+    const response = await fetch(`https://functions.poehali.dev/70a8d501-1b95-4105-97ed-d5928e0e12d5?id=${orderId}`, {
+      headers: {
+        ...storage.authHeaders(),
+      },
+    });
+    if (!response.ok) return;
+    const fresh: Order = await response.json();
+    setOrders((prev) => prev.map((o) => (o.id === fresh.id ? { ...o, ...fresh } : o)));
+    setSelectedOrder((prev) => (prev && prev.id === fresh.id ? { ...prev, ...fresh } : prev));
+    setPrice(fresh.price?.toString() || '');
+  };
+
   const setOrderPrice = async () => {
     if (!selectedOrder || !price) return;
 
     try {
-      await fetch('https://functions.poehali.dev/70a8d501-1b95-4105-97ed-d5928e0e12d5', {
+      const response = await fetch('https://functions.poehali.dev/70a8d501-1b95-4105-97ed-d5928e0e12d5', {
         method: 'PUT',
         headers: {
           'Content-Type': 'application/json',
-          'X-User-Id': userId!,
+          ...storage.authHeaders(),
         },
         body: JSON.stringify({
           order_id: selectedOrder.id,
           price: parseFloat(price),
+          version: selectedOrder.version,
         }),
       });
+      if (response.status === 409) {
+        const conflict = await response.json();
+        await reloadOrder(selectedOrder.id);
+        toast({
+          title: 'Конфликт изменений',
+          description: conflict.error || 'Заказ уже изменен, данные обновлены',
+          variant: 'destructive',
+        });
+        return;
+      }
+      if (!response.ok) throw new Error('update failed');
 
       toast({
         title: 'Успешно!',
@@ -181,7 +208,7 @@ const MasterDashboard = () => {
 
       const response = await fetch('https://functions.poehali.dev/70a8d501-1b95-4105-97ed-d5928e0e12d5', {
         headers: {
-          'X-User-Id': userId!,
+          ...storage.authHeaders(),
         },
       });
       const updatedOrders = await response.json();
@@ -224,6 +251,7 @@ const MasterDashboard = () => {
         <div className="flex items-center justify-between mb-6">
           <h1 className="text-3xl font-bold">Кабинет мастера</h1>
           <Button variant="outline" onClick={() => {
+            storage.clearAuth();
             localStorage.removeItem('userId');
             localStorage.removeItem('userName');
             navigate('/');